@@ -0,0 +1,203 @@
+"""Async request handlers backed by ``db.async_engine`` (CONTACT_DB_ASYNC=1).
+
+These mirror the auth, dashboard and CRUD handlers in ``main`` but await an
+aiosqlite ``AsyncSession`` instead of holding a Starlette threadpool thread
+for the whole request. ``main`` registers this router ahead of its own
+routes, so the matching sync handlers are shadowed when async mode is on.
+"""
+from __future__ import annotations
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Form, Request
+from fastapi.responses import RedirectResponse, Response
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from .auth import HashingBusy, password_hasher
+from .cache import user_cache
+from .contacts import (
+    apply_mutation, contact_fields, create_contact, flip_email_sent, flip_reminder_sent, get_owned,
+    page_query, remove_contact, stats_query, update_contact, version_query,
+)
+from .db import async_engine
+from .models import User
+from .web import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, dashboard_validators, decode_cursor, mutation_response,
+    not_modified, partial_mode, render_dashboard, templates,
+)
+
+router = APIRouter()
+
+
+def async_session() -> AsyncSession:
+    return AsyncSession(async_engine, expire_on_commit=False)
+
+
+async def load_user(uid: int) -> User | None:
+    async with async_session() as session:
+        return await session.get(User, uid)
+
+
+async def current_user(request: Request) -> User | None:
+    """Resolve the session user without a blocking lookup, and seed request.state for templates."""
+    state = request.scope.get("state")
+    if isinstance(state, dict) and "user" in state:
+        return state["user"]
+    uid = request.session.get("uid")
+    user = await user_cache.aget(uid, load_user) if uid else None
+    request.state.user = user
+    return user
+
+
+# Read-then-write transactions from concurrent tasks would otherwise hit
+# SQLITE_BUSY on lock upgrade; one writer at a time, as with db.WriteQueue.
+_write_lock = asyncio.Lock()
+
+
+async def run_write(fn, *args):
+    async with _write_lock, async_session() as session:
+        result = await session.run_sync(fn, *args)
+        await session.commit()
+        return result
+
+
+# ─────────────────────────────── Auth ──────────────────────────────────
+@router.post("/login")
+async def login(request: Request, username: str = Form(...), password: str = Form(...)):
+    # Error pages render base.html, which reads request.state.user
+    await current_user(request)
+    async with async_session() as session:
+        user = (await session.exec(select(User).where(User.username == username))).first()
+    if not user:
+        return templates.TemplateResponse("login.html", {"request": request, "error": "Invalid credentials"}, status_code=401)
+    try:
+        valid, new_hash = await password_hasher.verify(password, user.password_hash)
+    except HashingBusy:
+        return templates.TemplateResponse("login.html", {"request": request, "error": "Server is busy, please try again"}, status_code=503, headers={"Retry-After": "1"})
+    if not valid:
+        return templates.TemplateResponse("login.html", {"request": request, "error": "Invalid credentials"}, status_code=401)
+    if new_hash:
+        async with async_session() as session:
+            user.password_hash = new_hash
+            session.add(user)
+            await session.commit()
+    request.session["uid"] = user.id
+    return RedirectResponse("/dashboard", status_code=303)
+
+
+@router.post("/register")
+async def register(request: Request, username: str = Form(...), email: str = Form(""), password: str = Form(...)):
+    # Error pages render base.html, which reads request.state.user
+    await current_user(request)
+    async with async_session() as session:
+        exists = (await session.exec(select(User).where(User.username == username))).first()
+    if exists:
+        return templates.TemplateResponse("register.html", {"request": request, "error": "Username already exists"}, status_code=400)
+    try:
+        password_hash = await password_hasher.hash(password)
+    except HashingBusy:
+        return templates.TemplateResponse("register.html", {"request": request, "error": "Server is busy, please try again"}, status_code=503, headers={"Retry-After": "1"})
+    user = User(username=username.strip(), email=email.strip() or None, password_hash=password_hash)
+    async with async_session() as session:
+        session.add(user)
+        await session.commit()
+    request.session["uid"] = user.id
+    return RedirectResponse("/dashboard", status_code=303)
+
+
+# ─────────────────────────────── Dashboard ─────────────────────────────
+@router.get("/dashboard")
+async def dashboard(request: Request, limit: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None):
+    user = await current_user(request)
+    if not user:
+        return RedirectResponse("/login", status_code=303)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    async with async_session() as session:
+        version, changed_at = (await session.exec(version_query(user.id))).one()
+        headers, changed_at = dashboard_validators(user, version, changed_at)
+        if not_modified(request, headers["ETag"], changed_at):
+            return Response(status_code=304, headers=headers)
+        stats = (await session.exec(stats_query(user.id))).one()
+        key = decode_cursor(after) if after else None
+        contacts = (await session.exec(page_query(user.id, key, limit))).all()
+    return render_dashboard(request, user, stats, contacts, limit, key, headers)
+
+
+# ───────────── CRUD (require login) ─────────────
+@router.post("/add")
+async def add_contact(request: Request,
+    name: str = Form(...),
+    university: str = Form(...),
+    research_focus: str = Form(...),
+    contact_email: str = Form(...),
+    source_url: str = Form("")
+):
+    user = await current_user(request)
+    if not user:
+        return RedirectResponse("/login", status_code=303)
+    fields = contact_fields(name, university, research_focus, contact_email, source_url)
+    c, stats = await run_write(apply_mutation, partial_mode(request) is not None, create_contact, user.id, fields)
+    return mutation_response(request, c, stats)
+
+
+@router.get("/edit/{contact_id}")
+async def edit_form(request: Request, contact_id: int):
+    user = await current_user(request)
+    if not user:
+        return RedirectResponse("/login", status_code=303)
+    async with async_session() as session:
+        c = await session.run_sync(get_owned, user.id, contact_id)
+    if not c:
+        return RedirectResponse("/dashboard", status_code=303)
+    return templates.TemplateResponse("edit.html", {"request": request, "c": c, "user": user})
+
+
+@router.post("/edit/{contact_id}")
+async def edit_contact(
+    request: Request,
+    contact_id: int,
+    name: str = Form(...),
+    university: str = Form(...),
+    research_focus: str = Form(...),
+    contact_email: str = Form(...),
+    source_url: str = Form(""),
+    email_sent: Optional[str] = Form(None),
+    reminder_sent: Optional[str] = Form(None),
+):
+    user = await current_user(request)
+    if not user:
+        return RedirectResponse("/login", status_code=303)
+    fields = contact_fields(name, university, research_focus, contact_email, source_url)
+    c, stats = await run_write(
+        apply_mutation, partial_mode(request) is not None, update_contact, user.id, contact_id, fields,
+        email_sent is not None, reminder_sent is not None,
+    )
+    return mutation_response(request, c, stats)
+
+
+@router.post("/delete/{contact_id}")
+async def delete_contact(request: Request, contact_id: int):
+    user = await current_user(request)
+    if not user:
+        return RedirectResponse("/login", status_code=303)
+    await run_write(remove_contact, user.id, contact_id)
+    return RedirectResponse(url="/dashboard", status_code=303)
+
+
+@router.post("/toggle-email/{contact_id}")
+async def toggle_email(request: Request, contact_id: int):
+    user = await current_user(request)
+    if not user:
+        return RedirectResponse("/login", status_code=303)
+    c, stats = await run_write(apply_mutation, partial_mode(request) is not None, flip_email_sent, user.id, contact_id)
+    return mutation_response(request, c, stats)
+
+
+@router.post("/toggle-reminder/{contact_id}")
+async def toggle_reminder(request: Request, contact_id: int):
+    user = await current_user(request)
+    if not user:
+        return RedirectResponse("/login", status_code=303)
+    c, stats = await run_write(apply_mutation, partial_mode(request) is not None, flip_reminder_sent, user.id, contact_id)
+    return mutation_response(request, c, stats)
@@ -0,0 +1,189 @@
+from __future__ import annotations
+import csv
+import io
+import json
+import os
+from datetime import datetime, timezone
+from typing import IO, Iterable, Iterator
+
+from sqlalchemy import insert
+from sqlmodel import Session, select
+
+from .db import engine
+from .models import Contact
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+MAX_REPORTED_ERRORS = 1000
+
+FIELDS = ["name", "university", "research_focus", "contact_email", "source_url", "email_sent", "email_sent_at", "reminder_sent"]
+REQUIRED = ("name", "university", "research_focus", "contact_email")
+TRUE_VALUES = {"1", "true", "yes", "y", "on"}
+FALSE_VALUES = {"", "0", "false", "no", "n", "off"}
+
+
+def detect_format(filename: str | None, content_type: str | None) -> str:
+    name = (filename or "").lower()
+    if name.endswith((".jsonl", ".ndjson")) or (content_type or "").endswith(("ndjson", "jsonl")):
+        return "jsonl"
+    return "csv"
+
+
+def iter_records(stream: IO[bytes], fmt: str) -> Iterator[tuple[int, dict | None, str | None]]:
+    """Yield (line_no, record, parse_error) without reading the whole upload into memory.
+
+    JSONL lines are independent, so an undecodable line is reported and
+    skipped. In CSV a bad line or malformed field ends the stream with a final
+    error entry (quoted fields can span lines, so there is no safe place to
+    resume); the rows before it are still imported.
+    """
+    if fmt == "jsonl":
+        for line_no, raw in enumerate(stream, start=1):
+            try:
+                line = raw.decode("utf-8-sig" if line_no == 1 else "utf-8")
+            except UnicodeDecodeError as exc:
+                yield line_no, None, f"not valid UTF-8 ({exc.reason})"
+                continue
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                yield line_no, None, f"invalid JSON: {exc}"
+                continue
+            if not isinstance(record, dict):
+                yield line_no, None, "expected a JSON object"
+                continue
+            yield line_no, record, None
+        return
+
+    lines_read = 0
+
+    def decoded_lines() -> Iterator[str]:
+        # Decoded per line (not per buffer) so the rows before a bad byte still import
+        nonlocal lines_read
+        for raw in stream:
+            lines_read += 1
+            yield raw.decode("utf-8-sig" if lines_read == 1 else "utf-8")
+
+    reader = csv.DictReader(decoded_lines())
+    try:
+        for record in reader:
+            yield reader.line_num, record, None
+    except UnicodeDecodeError as exc:
+        yield lines_read, None, f"not valid UTF-8 ({exc.reason}); import stopped"
+    except csv.Error as exc:
+        yield lines_read, None, f"malformed CSV ({exc}); import stopped"
+
+
+def _parse_bool(value, field: str) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = str(value if value is not None else "").strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError(f"{field}: not a boolean: {value!r}")
+
+
+def _parse_datetime(value) -> datetime | None:
+    if value in (None, ""):
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).strip())
+    except ValueError:
+        raise ValueError(f"email_sent_at: not an ISO-8601 timestamp: {value!r}")
+    # Stored as UTC; the follow-up due math compares these as naive UTC
+    return parsed.astimezone(timezone.utc) if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def validate_record(record: dict, owner_id: int) -> dict:
+    """Normalize one import record into Contact column values, or raise ValueError."""
+    row = {}
+    for field in REQUIRED:
+        value = str(record.get(field) or "").strip()
+        if not value:
+            raise ValueError(f"{field}: required")
+        row[field] = value
+    if "@" not in row["contact_email"]:
+        raise ValueError(f"contact_email: not an email address: {row['contact_email']!r}")
+    row["source_url"] = str(record.get("source_url") or "").strip() or "#"
+    row["email_sent"] = _parse_bool(record.get("email_sent"), "email_sent")
+    row["reminder_sent"] = _parse_bool(record.get("reminder_sent"), "reminder_sent")
+    sent_at = _parse_datetime(record.get("email_sent_at"))
+    if row["email_sent"] and sent_at is None:
+        sent_at = datetime.now(timezone.utc)
+    row["email_sent_at"] = sent_at if row["email_sent"] else None
+    row["owner_id"] = owner_id
+    return row
+
+
+def import_contacts(stream: IO[bytes], fmt: str, owner_id: int) -> dict:
+    """Stream-parse an upload and insert valid rows in batched executemany transactions."""
+    imported = 0
+    error_count = 0
+    errors: list[dict] = []
+    batch: list[dict] = []
+
+    def flush() -> None:
+        nonlocal imported
+        if not batch:
+            return
+        with Session(engine) as session:
+            # Core insert on the table: the ORM bulk path drops None-valued keys and
+            # splits mixed batches into per-row statements
+            session.execute(insert(Contact.__table__), batch)
+            session.commit()
+        imported += len(batch)
+        batch.clear()
+
+    for line_no, record, error in iter_records(stream, fmt):
+        if error is None:
+            try:
+                batch.append(validate_record(record, owner_id))
+            except ValueError as exc:
+                error = str(exc)
+        if error is not None:
+            error_count += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"row": line_no, "error": error})
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            flush()
+    flush()
+    return {"imported": imported, "error_count": error_count, "errors": errors}
+
+
+def _export_rows(owner_id: int) -> Iterator[dict]:
+    columns = [getattr(Contact, f) for f in FIELDS]
+    with Session(engine) as session:
+        result = session.execute(
+            select(*columns)
+            .where(Contact.owner_id == owner_id)
+            .order_by(Contact.university, Contact.name, Contact.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        for row in result:
+            record = dict(row._mapping)
+            if record["email_sent_at"] is not None:
+                record["email_sent_at"] = record["email_sent_at"].isoformat()
+            yield record
+
+
+def export_contacts(owner_id: int, fmt: str) -> Iterable[str]:
+    """Yield the owner's contacts as CSV or JSONL chunks, one batch at a time."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDS)
+    if fmt == "csv":
+        writer.writeheader()
+    for i, record in enumerate(_export_rows(owner_id), start=1):
+        if fmt == "jsonl":
+            buffer.write(json.dumps(record) + "\n")
+        else:
+            writer.writerow(record)
+        if i % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
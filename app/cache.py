@@ -0,0 +1,102 @@
+from __future__ import annotations
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from .models import User
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+
+
+class UserCache:
+    """Bounded in-process cache of detached ``User`` rows keyed by uid (TTL + LRU)."""
+
+    def __init__(self, maxsize: int = USER_CACHE_SIZE, ttl: float = USER_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # Bumped on every invalidation; a load that overlapped one is not stored
+        self._epoch = 0
+        self._entries: OrderedDict[int, tuple[float, Optional[User]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lookup(self, uid: int) -> tuple[bool, Optional[User]]:
+        with self._lock:
+            entry = self._entries.get(uid)
+            if entry and entry[0] > time.monotonic():
+                self._entries.move_to_end(uid)
+                self.hits += 1
+                return True, entry[1]
+            self.misses += 1
+            return False, None
+
+    def _store(self, uid: int, user: Optional[User], epoch: int) -> None:
+        with self._lock:
+            if epoch != self._epoch:
+                return
+            self._entries[uid] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(uid)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get(self, uid: int, loader: Callable[[int], Optional[User]]) -> Optional[User]:
+        found, user = self._lookup(uid)
+        if not found:
+            epoch = self._epoch
+            user = loader(uid)
+            self._store(uid, user, epoch)
+        return user
+
+    async def aget(self, uid: int, loader: Callable[[int], Awaitable[Optional[User]]]) -> Optional[User]:
+        found, user = self._lookup(uid)
+        if not found:
+            epoch = self._epoch
+            user = await loader(uid)
+            self._store(uid, user, epoch)
+        return user
+
+    def invalidate(self, uid: int) -> None:
+        with self._lock:
+            self._epoch += 1
+            self._entries.pop(uid, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+user_cache = UserCache()
+
+
+# Mapper events fire at flush time, before the row is committed; evicting
+# then would let a concurrent request re-cache the old row for a full TTL.
+# Collect the ids per session and evict once the transaction commits.
+@event.listens_for(User, "after_insert")
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _collect_user(mapper, connection, target: User) -> None:
+    session = object_session(target)
+    if session is not None and target.id is not None:
+        session.info.setdefault("user_cache_evict", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_committed(session: Session) -> None:
+    for uid in session.info.pop("user_cache_evict", ()):
+        user_cache.invalidate(uid)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session: Session) -> None:
+    session.info.pop("user_cache_evict", None)
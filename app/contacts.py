@@ -0,0 +1,108 @@
+"""Contact queries and mutations shared by the sync and async request paths.
+
+Mutations take a plain (sync) ``Session`` so the sync handlers can run them
+through ``db.run_write`` and the async handlers through
+``AsyncSession.run_sync``; callers own the commit.
+"""
+from __future__ import annotations
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import case, func, tuple_
+from sqlmodel import Session, select
+
+from .models import Contact, User
+
+
+def version_query(owner_id: int):
+    return select(User.contacts_version, User.contacts_changed_at).where(User.id == owner_id)
+
+
+def stats_query(owner_id: int):
+    return select(
+        func.count(Contact.id),
+        func.coalesce(func.sum(case((Contact.email_sent, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((Contact.reminder_sent, 1), else_=0)), 0),
+    ).where(Contact.owner_id == owner_id)
+
+
+def page_query(owner_id: int, key: Optional[tuple[str, str, int]], limit: int):
+    """Keyset page ordered by (university, name, id); fetches one extra row to detect a next page."""
+    query = select(Contact).where(Contact.owner_id == owner_id)
+    if key:
+        query = query.where(tuple_(Contact.university, Contact.name, Contact.id) > key)
+    return query.order_by(Contact.university, Contact.name, Contact.id).limit(limit + 1)
+
+
+def apply_mutation(session: Session, want_stats: bool, mutation, owner_id: int, *args) -> tuple[Contact | None, dict | None]:
+    """Run ``mutation(session, owner_id, *args)``; with ``want_stats`` also return the owner's new counters."""
+    c = mutation(session, owner_id, *args)
+    if not (want_stats and c):
+        return c, None
+    session.flush()
+    total, sent, reminders = session.exec(stats_query(owner_id)).one()
+    return c, {"total": total, "sent": sent, "reminders": reminders}
+
+
+def contact_fields(name: str, university: str, research_focus: str, contact_email: str, source_url: str) -> dict:
+    return {
+        "name": name.strip(),
+        "university": university.strip(),
+        "research_focus": research_focus.strip(),
+        "contact_email": contact_email.strip(),
+        "source_url": source_url.strip() or "#",
+    }
+
+
+def get_owned(session: Session, owner_id: int, contact_id: int) -> Contact | None:
+    c = session.get(Contact, contact_id)
+    return c if c and c.owner_id == owner_id else None
+
+
+def create_contact(session: Session, owner_id: int, fields: dict) -> Contact:
+    c = Contact(**fields, owner_id=owner_id)
+    session.add(c)
+    return c
+
+
+def update_contact(session: Session, owner_id: int, contact_id: int, fields: dict,
+                   email_sent: bool, reminder_sent: bool) -> Contact | None:
+    c = get_owned(session, owner_id, contact_id)
+    if not c:
+        return None
+    for key, value in fields.items():
+        setattr(c, key, value)
+    if email_sent != c.email_sent:
+        c.email_sent = email_sent
+        c.email_sent_at = datetime.now(timezone.utc) if email_sent else None
+        c.followup_sent_at = None
+    c.reminder_sent = reminder_sent
+    session.add(c)
+    return c
+
+
+def remove_contact(session: Session, owner_id: int, contact_id: int) -> None:
+    c = get_owned(session, owner_id, contact_id)
+    if c:
+        session.delete(c)
+
+
+def flip_email_sent(session: Session, owner_id: int, contact_id: int) -> Contact | None:
+    c = get_owned(session, owner_id, contact_id)
+    if not c:
+        return None
+    c.email_sent = not c.email_sent
+    c.email_sent_at = datetime.now(timezone.utc) if c.email_sent else None
+    # A new first email starts a new follow-up cycle
+    c.followup_sent_at = None
+    session.add(c)
+    return c
+
+
+def flip_reminder_sent(session: Session, owner_id: int, contact_id: int) -> Contact | None:
+    c = get_owned(session, owner_id, contact_id)
+    if not c:
+        return None
+    c.reminder_sent = not c.reminder_sent
+    session.add(c)
+    return c
@@ -1,13 +1,206 @@
 from pathlib import Path
-from sqlmodel import SQLModel, create_engine
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Callable, TypeVar
+import contextvars
 import os
+import queue
+import threading
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, SQLModel, create_engine
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
 DB_OVERRIDE = os.getenv("CONTACT_DB")
 if DB_OVERRIDE:
     DB_PATH = DB_OVERRIDE
 else:
     DB_PATH = str(Path(__file__).resolve().parent.parent / "contact_tracker.db")
 
-engine = create_engine(f"sqlite:///{DB_PATH}", echo=False)
+# "default" keeps SQLite's stock settings; "production" enables WAL and tuned pragmas
+DB_PROFILE = os.getenv("CONTACT_DB_PROFILE", "default")
+DB_WRITE_QUEUE = os.getenv("CONTACT_DB_WRITE_QUEUE", "0") == "1"
+DB_POOL_SIZE = int(os.getenv("CONTACT_DB_POOL_SIZE", "20"))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("CONTACT_DB_BUSY_TIMEOUT_MS", "5000"))
+# Serve the request handlers from an aiosqlite-backed async engine instead
+DB_ASYNC = os.getenv("CONTACT_DB_ASYNC", "0") == "1"
+
+PRODUCTION_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": DB_BUSY_TIMEOUT_MS,
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,  # KiB, i.e. 64 MiB per connection
+}
+
+def _apply_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    for name, value in PRODUCTION_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+def create_sqlite_engine(path: str, profile: str = DB_PROFILE) -> Engine:
+    if profile != "production":
+        return create_engine(f"sqlite:///{path}", echo=False)
+    # Size the pool to cover Starlette's 40-thread request pool
+    new_engine = create_engine(
+        f"sqlite:///{path}",
+        echo=False,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_POOL_SIZE,
+        connect_args={"check_same_thread": False, "timeout": DB_BUSY_TIMEOUT_MS / 1000},
+    )
+    event.listen(new_engine, "connect", _apply_pragmas)
+    return new_engine
+
+def create_async_sqlite_engine(path: str, profile: str = DB_PROFILE) -> "AsyncEngine":
+    # Imported here so the sync-only deployment does not need aiosqlite
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+    if profile != "production":
+        return create_async_engine(f"sqlite+aiosqlite:///{path}", echo=False)
+    new_engine = create_async_engine(
+        f"sqlite+aiosqlite:///{path}",
+        echo=False,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_POOL_SIZE,
+        connect_args={"timeout": DB_BUSY_TIMEOUT_MS / 1000},
+    )
+    event.listen(new_engine.sync_engine, "connect", _apply_pragmas)
+    return new_engine
+
+engine = create_sqlite_engine(DB_PATH)
+async_engine = create_async_sqlite_engine(DB_PATH) if DB_ASYNC else None
+
+def add_missing_columns() -> None:
+    """Add columns introduced after a database was created (SQLite ALTER TABLE ADD COLUMN)."""
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for table in SQLModel.metadata.sorted_tables:
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=conn.dialect)}"
+                if column.server_default is not None:
+                    ddl += f" DEFAULT {column.server_default.arg}"
+                conn.execute(text(ddl))
+
+# Columns whose changes are visible on the dashboard; claim bookkeeping is not
+TRACKED_CONTACT_COLUMNS = "name, university, research_focus, contact_email, source_url, email_sent, email_sent_at, reminder_sent, owner_id"
+# SQLAlchemy's SQLite DATETIME format wants six fractional digits
+_NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now') || '000'"
+_BUMP = 'UPDATE "user" SET contacts_version = contacts_version + 1, contacts_changed_at = ' + _NOW + " WHERE id IN ({ids});"
+
+CHANGE_TRACKING = [
+    f"CREATE TRIGGER IF NOT EXISTS contact_version_ai AFTER INSERT ON contact BEGIN {_BUMP.format(ids='new.owner_id')} END",
+    f"CREATE TRIGGER IF NOT EXISTS contact_version_ad AFTER DELETE ON contact BEGIN {_BUMP.format(ids='old.owner_id')} END",
+    f"""CREATE TRIGGER IF NOT EXISTS contact_version_au AFTER UPDATE OF {TRACKED_CONTACT_COLUMNS} ON contact BEGIN
+        {_BUMP.format(ids='new.owner_id, old.owner_id')}
+    END""",
+]
 
 def init_db() -> None:
-    SQLModel.metadata.create_all(engine)
\ No newline at end of file
+    SQLModel.metadata.create_all(engine)
+    add_missing_columns()
+    # create_all skips indexes on tables that already exist; add any new ones
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+    with engine.begin() as conn:
+        for statement in CHANGE_TRACKING:
+            conn.execute(text(statement))
+
+# ───────────────────────────── Single writer ───────────────────────────
+T = TypeVar("T")
+
+class WriteQueue:
+    """Serializes small writes on one thread and commits queued jobs together.
+
+    Each job is ``fn(session)``; jobs drained in the same pass share one
+    transaction. If the group fails, each job is retried in its own
+    transaction so one bad write cannot sink its neighbours. Jobs run (and
+    flush) in a copy of the submitter's context, so per-request state such
+    as the metrics query counters follows them onto the writer thread.
+    """
+
+    def __init__(self, engine: Engine, max_batch: int = 64):
+        self.engine = engine
+        self.max_batch = max_batch
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable[[Session], T]) -> "Future[T]":
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self._thread.start()
+        future: Future = Future()
+        self._queue.put((fn, future, contextvars.copy_context()))
+        return future
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                return
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            jobs = [job]
+            while len(jobs) < self.max_batch:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    self._commit(jobs)
+                    return
+                jobs.append(job)
+            self._commit(jobs)
+
+    @staticmethod
+    def _apply(session: Session, fn: Callable[[Session], T]) -> T:
+        result = fn(session)
+        session.flush()
+        return result
+
+    def _commit(self, jobs: list) -> None:
+        try:
+            with Session(self.engine, expire_on_commit=False) as session:
+                results = [ctx.run(self._apply, session, fn) for fn, _, ctx in jobs]
+                session.commit()
+        except Exception:
+            for fn, future, ctx in jobs:
+                try:
+                    with Session(self.engine, expire_on_commit=False) as session:
+                        result = ctx.run(self._apply, session, fn)
+                        session.commit()
+                except Exception as exc:
+                    future.set_exception(exc)
+                else:
+                    future.set_result(result)
+            return
+        for (_, future, _), result in zip(jobs, results):
+            future.set_result(result)
+
+write_queue = WriteQueue(engine) if DB_WRITE_QUEUE else None
+
+def run_write(fn: Callable[[Session], T]) -> T:
+    """Run ``fn(session)`` and commit, through the single-writer queue when enabled."""
+    if write_queue is not None:
+        return write_queue.submit(fn).result()
+    with Session(engine, expire_on_commit=False) as session:
+        result = fn(session)
+        session.commit()
+        return result
@@ -0,0 +1,268 @@
+"""Follow-up scheduling for contacts that were emailed but never chased.
+
+A contact is due once ``email_sent`` is set, ``reminder_sent`` is not, and
+``email_sent_at`` is older than its owner's ``followup_days``. The scheduler
+(opt-in, FOLLOWUP_SCHEDULER=1) claims due contacts in bounded batches with a
+conditional ``UPDATE ... RETURNING id``, so concurrent workers never claim the
+same row, hands them to a delivery backend and records ``followup_sent_at``.
+``reminder_sent`` is left to the user. Claims older than the lease are
+considered abandoned and may be taken again; a worker that lost its claim
+does not mark the rows.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import os
+import smtplib
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+from typing import Optional, Protocol
+
+from sqlalchemy import and_, func, or_, update
+from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
+
+from .db import engine
+from .models import Contact, FollowUpOutbox, User
+
+logger = logging.getLogger(__name__)
+
+FOLLOWUP_SCHEDULER = os.getenv("FOLLOWUP_SCHEDULER", "0") == "1"
+FOLLOWUP_BACKEND = os.getenv("FOLLOWUP_BACKEND", "outbox")
+FOLLOWUP_POLL_SECONDS = float(os.getenv("FOLLOWUP_POLL_SECONDS", "60"))
+FOLLOWUP_BATCH_SIZE = int(os.getenv("FOLLOWUP_BATCH_SIZE", "100"))
+FOLLOWUP_MAX_BATCHES = int(os.getenv("FOLLOWUP_MAX_BATCHES", "10"))
+FOLLOWUP_LEASE_SECONDS = float(os.getenv("FOLLOWUP_LEASE_SECONDS", "300"))
+FOLLOWUP_SMTP_HOST = os.getenv("FOLLOWUP_SMTP_HOST", "localhost")
+FOLLOWUP_SMTP_PORT = int(os.getenv("FOLLOWUP_SMTP_PORT", "1025"))
+FOLLOWUP_FROM = os.getenv("FOLLOWUP_FROM", "contact-tracker@localhost")
+MIN_FOLLOWUP_DAYS = 1
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def pending_filter():
+    # Matches the partial index predicate on ix_contact_owner_followup_pending
+    return and_(Contact.email_sent == True, Contact.reminder_sent == False)  # noqa: E712
+
+
+def undelivered_filter():
+    # Matches the partial index predicate on ix_contact_followup_undelivered
+    return and_(pending_filter(), Contact.followup_sent_at.is_(None))
+
+
+def due_query(now: datetime, horizon: timedelta = timedelta(0), pending=pending_filter):
+    """Contacts whose follow-up is due by ``now + horizon`` under their owner's interval."""
+    at = (now + horizon).replace(tzinfo=None)
+    # Per-owner cutoff; the fixed lower bound lets SQLite range-scan the partial index
+    cutoff = func.datetime(at.isoformat(sep=" "), func.printf("-%d days", User.followup_days))
+    return (
+        select(Contact)
+        .join(User, User.id == Contact.owner_id)
+        .where(
+            pending(),
+            Contact.email_sent_at <= at - timedelta(days=MIN_FOLLOWUP_DAYS),
+            Contact.email_sent_at <= cutoff,
+        )
+    )
+
+
+# ─────────────────────────────── Backends ──────────────────────────────
+class DeliveryBackend(Protocol):
+    def deliver(self, session: Session, contacts: list[Contact]) -> list[Contact]:
+        """Deliver follow-ups and return the contacts actually sent; raise to leave the batch unmarked for a retry."""
+
+
+def render_followup(contact: Contact) -> tuple[str, str]:
+    subject = f"Following up: {contact.name} ({contact.university})"
+    body = (
+        f"Reminder to follow up with {contact.name} <{contact.contact_email}> "
+        f"about {contact.research_focus}. First email sent {contact.email_sent_at:%Y-%m-%d}."
+    )
+    return subject, body
+
+
+def owner_emails(session: Session, contacts: list[Contact]) -> dict[int, str]:
+    """Map owner id to address for the contacts' owners; owners without an email are left out."""
+    owners = session.exec(select(User).where(User.id.in_({c.owner_id for c in contacts}))).all()
+    return {u.id: u.email for u in owners if u.email}
+
+
+class OutboxBackend:
+    """Writes follow-ups to the outbox table in the same transaction that marks them.
+
+    Rows stay unsent (``sent_at`` is NULL) until an outbox consumer sends them.
+    """
+
+    def deliver(self, session: Session, contacts: list[Contact]) -> list[Contact]:
+        emails = owner_emails(session, contacts)
+        delivered = [c for c in contacts if c.owner_id in emails]
+        for c in delivered:
+            subject, body = render_followup(c)
+            session.add(FollowUpOutbox(contact_id=c.id, owner_id=c.owner_id, to_email=emails[c.owner_id], subject=subject, body=body))
+        return delivered
+
+
+class SmtpBackend:
+    """Sends follow-ups to the owner through an SMTP server (e.g. a local debugging server)."""
+
+    def __init__(self, host: str = FOLLOWUP_SMTP_HOST, port: int = FOLLOWUP_SMTP_PORT):
+        self.host = host
+        self.port = port
+
+    def deliver(self, session: Session, contacts: list[Contact]) -> list[Contact]:
+        emails = owner_emails(session, contacts)
+        delivered = [c for c in contacts if c.owner_id in emails]
+        if not delivered:
+            return []
+        with smtplib.SMTP(self.host, self.port, timeout=10) as smtp:
+            for c in delivered:
+                subject, body = render_followup(c)
+                message = EmailMessage()
+                message["From"] = FOLLOWUP_FROM
+                message["To"] = emails[c.owner_id]
+                message["Subject"] = subject
+                message.set_content(body)
+                smtp.send_message(message)
+        return delivered
+
+
+BACKENDS = {"outbox": OutboxBackend, "smtp": SmtpBackend}
+
+
+# ─────────────────────────────── Scheduler ─────────────────────────────
+class FollowUpScheduler:
+    def __init__(self, backend: DeliveryBackend, batch_size: int = FOLLOWUP_BATCH_SIZE,
+                 lease: timedelta = timedelta(seconds=FOLLOWUP_LEASE_SECONDS)):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.lease = lease
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        self.delivered = 0
+        self.failed = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def claim_batch(self, now: datetime) -> tuple[str, list[int]]:
+        """Atomically claim up to ``batch_size`` due contacts; return the token and claimed ids."""
+        token = f"{self.worker}:{uuid.uuid4().hex}"
+        stale = (now - self.lease).replace(tzinfo=None)
+        unclaimed = or_(Contact.followup_claimed_at.is_(None), Contact.followup_claimed_at < stale)
+        candidates = (
+            due_query(now, pending=undelivered_filter)
+            .where(unclaimed, User.email.is_not(None), User.email != "")  # nowhere to send the rest
+            .with_only_columns(Contact.id)
+            .order_by(Contact.email_sent_at)
+            .limit(self.batch_size)
+        )
+        with Session(engine) as session:
+            # The claim conditions are re-checked inside the UPDATE, so a row
+            # another worker claimed in the meantime is skipped, not stolen.
+            ids = session.execute(
+                update(Contact)
+                .where(Contact.id.in_(candidates.scalar_subquery()), undelivered_filter(), unclaimed)
+                .values(followup_claim=token, followup_claimed_at=now)
+                .returning(Contact.id)
+                .execution_options(synchronize_session=False)
+            ).scalars().all()
+            session.commit()
+        return token, list(ids)
+
+    def _release(self, session: Session, token: str, ids: list[int]) -> None:
+        session.execute(
+            update(Contact).where(Contact.id.in_(ids), Contact.followup_claim == token)
+            .values(followup_claim=None, followup_claimed_at=None)
+            .execution_options(synchronize_session=False)
+        )
+        session.commit()
+
+    def process_batch(self, token: str, ids: list[int]) -> int:
+        """Deliver the claimed contacts; returns how many were marked sent."""
+        with Session(engine) as session:
+            # By primary key; the token check drops rows whose lease was taken over
+            contacts = session.exec(select(Contact).where(Contact.id.in_(ids), Contact.followup_claim == token)).all()
+            if not contacts:
+                return 0
+            try:
+                delivered = self.backend.deliver(session, contacts)
+            except Exception:
+                logger.exception("follow-up delivery failed for %d contacts", len(contacts))
+                session.rollback()
+                self._release(session, token, ids)
+                self.failed += len(contacts)
+                return 0
+            marked = session.execute(
+                update(Contact)
+                .where(Contact.id.in_([c.id for c in delivered]), Contact.followup_claim == token)
+                .values(followup_sent_at=_utcnow(), followup_claim=None, followup_claimed_at=None)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if marked != len(delivered):
+                # Another worker took over part of the batch; let it own the delivery
+                logger.warning("lost %d follow-up claims mid-batch", len(delivered) - marked)
+                session.rollback()
+                self._release(session, token, ids)
+                return 0
+            session.commit()
+            if len(delivered) < len(contacts):
+                # Skipped by the backend (e.g. the owner has no email); leave them unsent
+                self._release(session, token, ids)
+        self.delivered += marked
+        return marked
+
+    def run_once(self, max_batches: int = FOLLOWUP_MAX_BATCHES) -> int:
+        processed = 0
+        for _ in range(max_batches):
+            token, ids = self.claim_batch(_utcnow())
+            if not ids:
+                break
+            done = self.process_batch(token, ids)
+            if not done:
+                break  # delivery failed; claims were released for the next pass
+            processed += done
+        return processed
+
+    async def _loop(self, interval: float) -> None:
+        while True:
+            try:
+                await run_in_threadpool(self.run_once)
+            except Exception:
+                logger.exception("follow-up scheduler pass failed")
+            await asyncio.sleep(interval)
+
+    def start(self, interval: float = FOLLOWUP_POLL_SECONDS) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._loop(interval))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {"running": self._task is not None, "delivered": self.delivered, "failed": self.failed}
+
+
+scheduler = FollowUpScheduler(BACKENDS[FOLLOWUP_BACKEND]())
+
+
+def due_soon(owner_id: int, days: int, limit: int = 100) -> list[tuple[Contact, datetime]]:
+    """Owner's pending follow-ups due within ``days``, soonest first, with their due time."""
+    now = _utcnow()
+    with Session(engine) as session:
+        owner = session.get(User, owner_id)
+        contacts = session.exec(
+            due_query(now, timedelta(days=days))
+            .where(Contact.owner_id == owner_id)
+            .order_by(Contact.email_sent_at)
+            .limit(limit)
+        ).all()
+    interval = timedelta(days=owner.followup_days if owner else 7)
+    return [(c, c.email_sent_at + interval) for c in contacts]
@@ -3,38 +3,90 @@ import os
 from datetime import datetime, timezone
 from typing import Optional
 
-from fastapi import FastAPI, Request, Form
-from fastapi.responses import RedirectResponse
+from fastapi import FastAPI, File, Request, Form, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
+from starlette.concurrency import run_in_threadpool
 from starlette.middleware.sessions import SessionMiddleware
 from sqlmodel import Session, select
 
-from .db import engine, init_db
+from .db import DB_ASYNC, async_engine, engine, init_db, run_write, write_queue
 from .models import Contact, User
-from .auth import get_password_hash, verify_password
+from .contacts import (
+    apply_mutation, contact_fields, create_contact, flip_email_sent, flip_reminder_sent, get_owned,
+    page_query, remove_contact, stats_query, update_contact, version_query,
+)
+from .web import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, dashboard_validators, decode_cursor, mutation_response,
+    not_modified, partial_mode, render_dashboard, templates,
+)
+from .followups import FOLLOWUP_SCHEDULER, MIN_FOLLOWUP_DAYS, due_soon, scheduler
+from .search import init_search, search_contacts
+from .bulk import detect_format, export_contacts, import_contacts
+from .auth import HashingBusy, get_password_hash, password_hasher
+from .cache import user_cache
+from .metrics import instrument, render_metrics
 
 SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-change-me")
 
 app = FastAPI(title="Contact Tracker")
 app.add_middleware(SessionMiddleware, secret_key=SECRET_KEY, session_cookie="ct_session")
 app.mount("/static", StaticFiles(directory="static"), name="static")
-templates = Jinja2Templates(directory="templates")
 
 # ─────────────────────────────── Helpers ───────────────────────────────
 
+def load_user(uid: int) -> User | None:
+    with Session(engine) as session:
+        return session.get(User, uid)
+
 def get_user_from_session(request: Request) -> User | None:
     uid = request.session.get("uid")
     if not uid:
         return None
+    return user_cache.get(uid, load_user)
+
+class LazyUserState(dict):
+    """Request state dict that resolves ``user`` from the session on first read."""
+
+    def __init__(self, request: Request, initial: dict):
+        super().__init__(initial)
+        self._request = request
+
+    def __missing__(self, key):
+        if key != "user":
+            raise KeyError(key)
+        user = self["user"] = get_user_from_session(self._request)
+        return user
+
+async def seed_user(request: Request) -> None:
+    """Resolve the session user off the event loop before an async handler renders a page."""
+    state = request.scope.get("state")
+    if isinstance(state, dict) and "user" not in state:
+        request.state.user = await run_in_threadpool(get_user_from_session, request)
+
+def find_user_by_username(username: str) -> User | None:
     with Session(engine) as session:
-        return session.get(User, uid)
+        return session.exec(select(User).where(User.username == username)).first()
+
+def save_user(user: User) -> User:
+    with Session(engine) as session:
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+        return user
+
+# Paths that never render a user-aware page
+USERLESS_PATHS = ("/static/", "/health", "/metrics")
 
 @app.middleware("http")
 async def attach_user(request: Request, call_next):
-    request.state.user = get_user_from_session(request)
+    if not request.url.path.startswith(USERLESS_PATHS):
+        request.scope["state"] = LazyUserState(request, request.scope.get("state", {}))
     return await call_next(request)
 
+# Registered last so it wraps everything else, including the user lookup
+app.middleware("http")(instrument)
+
 # ─────────────────────────────── Seed data ─────────────────────────────
 SEED_CONTACTS: list[dict] = [
     {"name": "Danilo Bzdok", "university": "McGill (IPN)", "research_focus": "computational neuroimaging, ML", "contact_email": "danilo.bzdok@mcgill.ca", "source_url": "https://www.mcgill.ca/ipn/prospective/supervisors-recruiting"},
@@ -45,6 +97,7 @@ SEED_CONTACTS: list[dict] = [
 @app.on_event("startup")
 def on_startup() -> None:
     init_db()
+    init_search()
     with Session(engine) as session:
         any_user = session.exec(select(User).limit(1)).first()
         if not any_user:
@@ -55,11 +108,39 @@ def on_startup() -> None:
             for row in SEED_CONTACTS:
                 session.add(Contact(**row, owner_id=demo.id))
             session.commit()
+    if FOLLOWUP_SCHEDULER:
+        scheduler.start()
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    await scheduler.stop()
+    password_hasher.shutdown()
+    if write_queue is not None:
+        write_queue.stop()
+    if async_engine is not None:
+        await async_engine.dispose()
 
 # ─────────────────────────────── Routes ────────────────────────────────
+if DB_ASYNC:
+    # Registered first so these take precedence over the sync handlers below
+    from .async_routes import router as async_router
+    app.include_router(async_router)
+
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    return {"status": "ok", "user_cache": user_cache.stats(), "hashing": password_hasher.stats(), "followups": scheduler.stats()}
+
+@app.get("/metrics")
+def metrics():
+    cache = user_cache.stats()
+    hashing = password_hasher.stats()
+    gauges = {"user_cache_size": cache["size"], "password_hash_pending": hashing["pending"]}
+    counters = {
+        "user_cache_hits_total": cache["hits"],
+        "user_cache_misses_total": cache["misses"],
+        "password_hash_rejected_total": hashing["rejected"],
+    }
+    return PlainTextResponse(render_metrics(gauges, counters), media_type="text/plain; version=0.0.4")
 
 @app.get("/")
 def root() -> RedirectResponse:
@@ -72,12 +153,22 @@ def login_form(request: Request):
     return templates.TemplateResponse("login.html", {"request": request})
 
 @app.post("/login")
-def login(request: Request, username: str = Form(...), password: str = Form(...)):
-    with Session(engine) as session:
-        user = session.exec(select(User).where(User.username == username)).first()
-        if not user or not verify_password(password, user.password_hash):
-            return templates.TemplateResponse("login.html", {"request": request, "error": "Invalid credentials"}, status_code=401)
-        request.session["uid"] = user.id
+async def login(request: Request, username: str = Form(...), password: str = Form(...)):
+    # Error pages render base.html, which reads request.state.user
+    await seed_user(request)
+    user = await run_in_threadpool(find_user_by_username, username)
+    if not user:
+        return templates.TemplateResponse("login.html", {"request": request, "error": "Invalid credentials"}, status_code=401)
+    try:
+        valid, new_hash = await password_hasher.verify(password, user.password_hash)
+    except HashingBusy:
+        return templates.TemplateResponse("login.html", {"request": request, "error": "Server is busy, please try again"}, status_code=503, headers={"Retry-After": "1"})
+    if not valid:
+        return templates.TemplateResponse("login.html", {"request": request, "error": "Invalid credentials"}, status_code=401)
+    if new_hash:
+        user.password_hash = new_hash
+        await run_in_threadpool(save_user, user)
+    request.session["uid"] = user.id
     return RedirectResponse("/dashboard", status_code=303)
 
 @app.get("/register")
@@ -87,16 +178,19 @@ def register_form(request: Request):
     return templates.TemplateResponse("register.html", {"request": request})
 
 @app.post("/register")
-def register(request: Request, username: str = Form(...), email: str = Form(""), password: str = Form(...)):
-    with Session(engine) as session:
-        exists = session.exec(select(User).where(User.username == username)).first()
-        if exists:
-            return templates.TemplateResponse("register.html", {"request": request, "error": "Username already exists"}, status_code=400)
-        user = User(username=username.strip(), email=email.strip() or None, password_hash=get_password_hash(password))
-        session.add(user)
-        session.commit()
-        session.refresh(user)
-        request.session["uid"] = user.id
+async def register(request: Request, username: str = Form(...), email: str = Form(""), password: str = Form(...)):
+    # Error pages render base.html, which reads request.state.user
+    await seed_user(request)
+    exists = await run_in_threadpool(find_user_by_username, username)
+    if exists:
+        return templates.TemplateResponse("register.html", {"request": request, "error": "Username already exists"}, status_code=400)
+    try:
+        password_hash = await password_hasher.hash(password)
+    except HashingBusy:
+        return templates.TemplateResponse("register.html", {"request": request, "error": "Server is busy, please try again"}, status_code=503, headers={"Retry-After": "1"})
+    user = User(username=username.strip(), email=email.strip() or None, password_hash=password_hash)
+    user = await run_in_threadpool(save_user, user)
+    request.session["uid"] = user.id
     return RedirectResponse("/dashboard", status_code=303)
 
 @app.post("/logout")
@@ -105,18 +199,61 @@ def logout(request: Request):
     return RedirectResponse("/login", status_code=303)
 
 @app.get("/dashboard")
-def dashboard(request: Request):
+def dashboard(request: Request, limit: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None):
     if not request.state.user:
         return RedirectResponse("/login", status_code=303)
     user = request.state.user
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
     with Session(engine) as session:
-        contacts = session.exec(
-            select(Contact).where(Contact.owner_id == user.id).order_by(Contact.university, Contact.name)
-        ).all()
-        total = len(contacts)
-        sent = sum(1 for c in contacts if c.email_sent)
-        reminders = sum(1 for c in contacts if c.reminder_sent)
-    return templates.TemplateResponse("index.html", {"request": request, "contacts": contacts, "user": user, "stats": {"total": total, "sent": sent, "reminders": reminders}})
+        # Version is read first so a concurrent write can only make the ETag stale-low
+        version, changed_at = session.exec(version_query(user.id)).one()
+        headers, changed_at = dashboard_validators(user, version, changed_at)
+        if not_modified(request, headers["ETag"], changed_at):
+            return Response(status_code=304, headers=headers)
+        stats = session.exec(stats_query(user.id)).one()
+        key = decode_cursor(after) if after else None
+        contacts = session.exec(page_query(user.id, key, limit)).all()
+    return render_dashboard(request, user, stats, contacts, limit, key, headers)
+
+SEARCH_PAGE_SIZE = 20
+
+@app.get("/search")
+def search(request: Request, q: str = "", page: int = 1, limit: int = SEARCH_PAGE_SIZE):
+    user = request.state.user
+    if not user:
+        return RedirectResponse("/login", status_code=303)
+    page = max(1, page)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    with Session(engine) as session:
+        ids = search_contacts(session.connection(), user.id, q, limit + 1, (page - 1) * limit)
+        has_next = len(ids) > limit
+        ids = ids[:limit]
+        by_id = {c.id: c for c in session.exec(select(Contact).where(Contact.id.in_(ids))).all()} if ids else {}
+    contacts = [by_id[i] for i in ids if i in by_id]
+    return templates.TemplateResponse("search.html", {"request": request, "user": user, "q": q, "contacts": contacts, "page": page, "limit": limit, "has_next": has_next})
+
+@app.get("/due")
+def due_followups(request: Request, days: int = 7):
+    user = request.state.user
+    if not user:
+        return RedirectResponse("/login", status_code=303)
+    days = max(0, min(days, 365))
+    rows = due_soon(user.id, days)
+    return templates.TemplateResponse("due.html", {"request": request, "user": user, "rows": rows, "days": days, "now": datetime.now(timezone.utc).replace(tzinfo=None)})
+
+@app.post("/settings/followup-days")
+def set_followup_days(request: Request, followup_days: int = Form(...)):
+    user = request.state.user
+    if not user:
+        return RedirectResponse("/login", status_code=303)
+
+    def write(session: Session) -> None:
+        u = session.get(User, user.id)
+        u.followup_days = max(MIN_FOLLOWUP_DAYS, min(followup_days, 365))
+        session.add(u)
+
+    run_write(write)
+    return RedirectResponse(url="/due", status_code=303)
 
 # ───────────── CRUD (require login) ─────────────
 @app.post("/add")
@@ -130,18 +267,9 @@ def add_contact(request: Request,
     user = request.state.user
     if not user:
         return RedirectResponse("/login", status_code=303)
-    with Session(engine) as session:
-        c = Contact(
-            name=name.strip(),
-            university=university.strip(),
-            research_focus=research_focus.strip(),
-            contact_email=contact_email.strip(),
-            source_url=source_url.strip() or "#",
-            owner_id=user.id,
-        )
-        session.add(c)
-        session.commit()
-    return RedirectResponse(url="/dashboard", status_code=303)
+    fields = contact_fields(name, university, research_focus, contact_email, source_url)
+    c, stats = run_write(lambda session: apply_mutation(session, partial_mode(request) is not None, create_contact, user.id, fields))
+    return mutation_response(request, c, stats)
 
 @app.get("/edit/{contact_id}")
 def edit_form(request: Request, contact_id: int):
@@ -149,8 +277,8 @@ def edit_form(request: Request, contact_id: int):
     if not user:
         return RedirectResponse("/login", status_code=303)
     with Session(engine) as session:
-        c = session.get(Contact, contact_id)
-        if not c or c.owner_id != user.id:
+        c = get_owned(session, user.id, contact_id)
+        if not c:
             return RedirectResponse("/dashboard", status_code=303)
     return templates.TemplateResponse("edit.html", {"request": request, "c": c, "user": user})
 
@@ -169,37 +297,19 @@ def edit_contact(
     user = request.state.user
     if not user:
         return RedirectResponse("/login", status_code=303)
-    with Session(engine) as session:
-        c = session.get(Contact, contact_id)
-        if not c or c.owner_id != user.id:
-            return RedirectResponse("/dashboard", status_code=303)
-        c.name = name.strip()
-        c.university = university.strip()
-        c.research_focus = research_focus.strip()
-        c.contact_email = contact_email.strip()
-        c.source_url = source_url.strip() or "#"
-
-        new_email_sent = email_sent is not None
-        if new_email_sent != c.email_sent:
-            c.email_sent = new_email_sent
-            c.email_sent_at = datetime.now(timezone.utc) if new_email_sent else None
-
-        c.reminder_sent = reminder_sent is not None
-
-        session.add(c)
-        session.commit()
-    return RedirectResponse(url="/dashboard", status_code=303)
+    fields = contact_fields(name, university, research_focus, contact_email, source_url)
+    c, stats = run_write(lambda session: apply_mutation(
+        session, partial_mode(request) is not None, update_contact, user.id, contact_id, fields,
+        email_sent is not None, reminder_sent is not None,
+    ))
+    return mutation_response(request, c, stats)
 
 @app.post("/delete/{contact_id}")
 def delete_contact(request: Request, contact_id: int):
     user = request.state.user
     if not user:
         return RedirectResponse("/login", status_code=303)
-    with Session(engine) as session:
-        c = session.get(Contact, contact_id)
-        if c and c.owner_id == user.id:
-            session.delete(c)
-            session.commit()
+    run_write(lambda session: remove_contact(session, user.id, contact_id))
     return RedirectResponse(url="/dashboard", status_code=303)
 
 @app.post("/toggle-email/{contact_id}")
@@ -207,25 +317,33 @@ def toggle_email(request: Request, contact_id: int):
     user = request.state.user
     if not user:
         return RedirectResponse("/login", status_code=303)
-    with Session(engine) as session:
-        c = session.get(Contact, contact_id)
-        if c and c.owner_id == user.id:
-            new_state = not c.email_sent
-            c.email_sent = new_state
-            c.email_sent_at = datetime.now(timezone.utc) if new_state else None
-            session.add(c)
-            session.commit()
-    return RedirectResponse(url="/dashboard", status_code=303)
+    c, stats = run_write(lambda session: apply_mutation(session, partial_mode(request) is not None, flip_email_sent, user.id, contact_id))
+    return mutation_response(request, c, stats)
 
 @app.post("/toggle-reminder/{contact_id}")
 def toggle_reminder(request: Request, contact_id: int):
     user = request.state.user
     if not user:
         return RedirectResponse("/login", status_code=303)
-    with Session(engine) as session:
-        c = session.get(Contact, contact_id)
-        if c and c.owner_id == user.id:
-            c.reminder_sent = not c.reminder_sent
-            session.add(c)
-            session.commit()
-    return RedirectResponse(url="/dashboard", status_code=303)
\ No newline at end of file
+    c, stats = run_write(lambda session: apply_mutation(session, partial_mode(request) is not None, flip_reminder_sent, user.id, contact_id))
+    return mutation_response(request, c, stats)
+
+# ───────────── Bulk import / export ─────────────
+@app.post("/contacts/import")
+def import_contacts_upload(request: Request, file: UploadFile = File(...), format: Optional[str] = Form(None)):
+    user = request.state.user
+    if not user:
+        return RedirectResponse("/login", status_code=303)
+    fmt = format if format in ("csv", "jsonl") else detect_format(file.filename, file.content_type)
+    report = import_contacts(file.file, fmt, user.id)
+    return JSONResponse(report, status_code=200 if report["imported"] or not report["error_count"] else 400)
+
+@app.get("/contacts/export")
+def export_contacts_download(request: Request, format: str = "csv"):
+    user = request.state.user
+    if not user:
+        return RedirectResponse("/login", status_code=303)
+    fmt = "jsonl" if format == "jsonl" else "csv"
+    media_type = "application/x-ndjson" if fmt == "jsonl" else "text/csv"
+    headers = {"Content-Disposition": f'attachment; filename="contacts.{fmt}"'}
+    return StreamingResponse(export_contacts(user.id, fmt), media_type=media_type, headers=headers)
\ No newline at end of file
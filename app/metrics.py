@@ -0,0 +1,226 @@
+"""In-process performance instrumentation exposed in Prometheus text format.
+
+* ``instrument`` (HTTP middleware) times every request per route template and
+  keeps a per-request ``RequestStats`` in a context variable.
+* SQLAlchemy cursor events count and time every statement, attributing them
+  to the current request when there is one. Write-queue jobs carry the
+  request's context to the writer thread, and streamed bodies are recorded
+  once they finish, so both are included.
+* ``TimedTemplate`` times Jinja renders; ``observe_hash`` times bcrypt work.
+
+Set METRICS_SERVER_TIMING=1 to add a ``Server-Timing`` header to responses,
+and METRICS_SLOW_MS / METRICS_QUERY_WARN to tune the slow-request log.
+"""
+from __future__ import annotations
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from fastapi import Request
+from jinja2 import Template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("app.slow_requests")
+
+METRICS_SERVER_TIMING = os.getenv("METRICS_SERVER_TIMING", "0") == "1"
+METRICS_SLOW_MS = float(os.getenv("METRICS_SLOW_MS", "500"))
+METRICS_QUERY_WARN = int(os.getenv("METRICS_QUERY_WARN", "50"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values."""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...], buckets: tuple[float, ...]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, (counts, total, count) in sorted(self._series.items()):
+                base = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, label_values))
+                sep = "," if base else ""
+                for bound, n in zip(self.buckets, counts):
+                    lines.append(f'{self.name}_bucket{{{base}{sep}le="{bound}"}} {n}')
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {count}')
+                lines.append(f"{self.name}_sum{{{base}}} {total}")
+                lines.append(f"{self.name}_count{{{base}}} {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                base = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, label_values))
+                lines.append(f"{self.name}{{{base}}} {value}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "Request latency by route.", ("method", "route"), LATENCY_BUCKETS)
+REQUESTS = Counter("http_requests_total", "Requests by route and status.", ("method", "route", "status"))
+QUERIES_PER_REQUEST = Histogram("db_queries_per_request", "SQL statements issued per request.", ("method", "route"), COUNT_BUCKETS)
+QUERY_LATENCY = Histogram("db_query_duration_seconds", "SQL statement execution time.", (), LATENCY_BUCKETS)
+TEMPLATE_LATENCY = Histogram("template_render_duration_seconds", "Jinja template render time.", ("template",), LATENCY_BUCKETS)
+HASH_LATENCY = Histogram("password_hash_duration_seconds", "bcrypt hash/verify time including pool wait.", ("op",), LATENCY_BUCKETS)
+SLOW_REQUESTS = Counter("http_slow_requests_total", "Requests slower than METRICS_SLOW_MS.", ("method", "route"))
+
+REGISTRY = (REQUEST_LATENCY, REQUESTS, QUERIES_PER_REQUEST, QUERY_LATENCY, TEMPLATE_LATENCY, HASH_LATENCY, SLOW_REQUESTS)
+
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    query_s: float = 0.0
+    template_s: float = 0.0
+    hash_s: float = 0.0
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+# ─────────────────────────────── SQL hooks ─────────────────────────────
+# The start time lives on the per-statement execution context, so a statement
+# that fails (no after_cursor_execute) leaves nothing behind on the connection.
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    context._metrics_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - context._metrics_start
+    QUERY_LATENCY.observe(elapsed)
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_s += elapsed
+
+
+# ─────────────────────────────── Templates ─────────────────────────────
+class TimedTemplate(Template):
+    """Jinja template class that records top-level render time."""
+
+    def render(self, *args, **kwargs) -> str:
+        start = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            TEMPLATE_LATENCY.observe(elapsed, self.name or "<string>")
+            stats = _current.get()
+            if stats is not None:
+                stats.template_s += elapsed
+
+
+def observe_hash(op: str, elapsed: float) -> None:
+    HASH_LATENCY.observe(elapsed, op)
+    stats = _current.get()
+    if stats is not None:
+        stats.hash_s += elapsed
+
+
+# ─────────────────────────────── Middleware ────────────────────────────
+def route_name(request: Request) -> str:
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or "<unmatched>"
+
+
+def _record(request: Request, status: int, stats: RequestStats, start: float) -> None:
+    elapsed = time.perf_counter() - start
+    route = route_name(request)
+    REQUEST_LATENCY.observe(elapsed, request.method, route)
+    REQUESTS.inc(request.method, route, str(status))
+    QUERIES_PER_REQUEST.observe(stats.queries, request.method, route)
+    if elapsed * 1000 >= METRICS_SLOW_MS or stats.queries >= METRICS_QUERY_WARN:
+        SLOW_REQUESTS.inc(request.method, route)
+        logger.warning(
+            "slow request %s %s status=%s total=%.1fms queries=%d db=%.1fms template=%.1fms hash=%.1fms",
+            request.method, route, status, elapsed * 1000, stats.queries,
+            stats.query_s * 1000, stats.template_s * 1000, stats.hash_s * 1000,
+        )
+
+
+async def _record_after_body(body, record: Callable[[], None]):
+    try:
+        async for chunk in body:
+            yield chunk
+    finally:
+        record()
+
+
+async def instrument(request: Request, call_next):
+    stats = RequestStats()
+    token = _current.set(stats)
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    except Exception:
+        _record(request, 500, stats, start)
+        raise
+    finally:
+        _current.reset(token)
+    if METRICS_SERVER_TIMING:
+        # Headers go out before a streamed body, so this covers work up to the first byte
+        elapsed = time.perf_counter() - start
+        response.headers["Server-Timing"] = (
+            f'db;dur={stats.query_s * 1000:.2f};desc="{stats.queries} queries", '
+            f"tpl;dur={stats.template_s * 1000:.2f}, hash;dur={stats.hash_s * 1000:.2f}, "
+            f"total;dur={elapsed * 1000:.2f}"
+        )
+    # Streamed bodies (e.g. /contacts/export) still run queries after call_next
+    # returns; the endpoint task shares ``stats``, so record once the body is done.
+    response.body_iterator = _record_after_body(
+        response.body_iterator, lambda: _record(request, response.status_code, stats, start)
+    )
+    return response
+
+
+def render_metrics(gauges: dict[str, float] | None = None, counters: dict[str, float] | None = None) -> str:
+    """Render the registry plus point-in-time values collected from other components."""
+    lines: list[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    for kind, values in (("gauge", gauges), ("counter", counters)):
+        for name, value in (values or {}).items():
+            lines.extend([f"# TYPE {name} {kind}", f"{name} {value}"])
+    return "\n".join(lines) + "\n"
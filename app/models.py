@@ -3,6 +3,7 @@ from datetime import datetime, timezone
 from typing import Optional
 
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Index, text
 from sqlalchemy.orm import relationship
 
 
@@ -12,12 +13,36 @@ class User(SQLModel, table=True):
     email: Optional[str] = None
     password_hash: str
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    # Days after the first email before a follow-up is due
+    followup_days: int = Field(default=7, sa_column_kwargs={"server_default": "7"})
+    # Bumped by triggers on every change to the user's contacts (dashboard ETag)
+    contacts_version: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    contacts_changed_at: Optional[datetime] = None
 
     # Classic SQLAlchemy relationship with explicit target
     contacts: list["Contact"] = relationship("Contact", back_populates="owner")
 
 
 class Contact(SQLModel, table=True):
+    # Covers the dashboard filter + keyset order (owner_id, university, name, rowid)
+    __table_args__ = (
+        Index("ix_contact_owner_university_name", "owner_id", "university", "name"),
+        # Covers the dashboard stats aggregate without touching the table
+        Index("ix_contact_owner_status", "owner_id", "email_sent", "reminder_sent"),
+        # Only rows the scheduler has yet to hand off; covers its due scan across owners
+        Index(
+            "ix_contact_followup_undelivered",
+            "email_sent_at", "owner_id", "followup_claimed_at",
+            sqlite_where=text("email_sent = 1 AND reminder_sent = 0 AND followup_sent_at IS NULL"),
+        ),
+        # Owner-leading twin for the per-user due-soon view, ordered by email_sent_at
+        Index(
+            "ix_contact_owner_followup_pending",
+            "owner_id", "email_sent_at",
+            sqlite_where=text("email_sent = 1 AND reminder_sent = 0"),
+        ),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
     university: str
@@ -28,7 +53,23 @@ class Contact(SQLModel, table=True):
     email_sent: bool = Field(default=False)
     email_sent_at: Optional[datetime] = None
     reminder_sent: bool = Field(default=False)
+    # Set while a scheduler worker owns the follow-up; stale claims expire
+    followup_claim: Optional[str] = None
+    followup_claimed_at: Optional[datetime] = None
+    # When the scheduler handed the follow-up to its backend; reminder_sent stays the user's
+    followup_sent_at: Optional[datetime] = None
 
     owner_id: Optional[int] = Field(default=None, foreign_key="user.id")
     # Relationship back to User
     owner: Optional["User"] = relationship("User", back_populates="contacts")
+
+
+class FollowUpOutbox(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    contact_id: int = Field(foreign_key="contact.id", index=True)
+    owner_id: int = Field(foreign_key="user.id")
+    to_email: str
+    subject: str
+    body: str
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    sent_at: Optional[datetime] = None
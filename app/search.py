@@ -0,0 +1,88 @@
+"""FTS5-backed contact search.
+
+``contact_fts`` is an external-content index over the searchable Contact
+columns; triggers keep it in step with inserts, updates and deletes. For a
+database created before the index existed, run::
+
+    python -m app.search rebuild
+"""
+from __future__ import annotations
+import re
+import sys
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from .db import engine
+
+FTS_COLUMNS = ("name", "university", "research_focus", "contact_email")
+
+_COLS = ", ".join(FTS_COLUMNS)
+_NEW = ", ".join(f"new.{c}" for c in FTS_COLUMNS)
+_OLD = ", ".join(f"old.{c}" for c in FTS_COLUMNS)
+
+SCHEMA = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS contact_fts USING fts5({_COLS}, content='contact', content_rowid='id')",
+    f"""CREATE TRIGGER IF NOT EXISTS contact_fts_ai AFTER INSERT ON contact BEGIN
+        INSERT INTO contact_fts(rowid, {_COLS}) VALUES (new.id, {_NEW});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS contact_fts_ad AFTER DELETE ON contact BEGIN
+        INSERT INTO contact_fts(contact_fts, rowid, {_COLS}) VALUES ('delete', old.id, {_OLD});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS contact_fts_au AFTER UPDATE OF {_COLS} ON contact BEGIN
+        INSERT INTO contact_fts(contact_fts, rowid, {_COLS}) VALUES ('delete', old.id, {_OLD});
+        INSERT INTO contact_fts(rowid, {_COLS}) VALUES (new.id, {_NEW});
+    END""",
+]
+
+# Weights follow FTS_COLUMNS: a name hit outranks a research-area hit, and so on
+RANK = "bm25(contact_fts, 10.0, 3.0, 5.0, 1.0)"
+
+
+def init_search(bind: Engine = engine) -> None:
+    """Create the FTS table and triggers; backfill when the table is new."""
+    with bind.begin() as conn:
+        existed = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'contact_fts'")
+        ).first()
+        for statement in SCHEMA:
+            conn.execute(text(statement))
+        if not existed:
+            conn.execute(text("INSERT INTO contact_fts(contact_fts) VALUES ('rebuild')"))
+
+
+def rebuild_index(bind: Engine = engine) -> None:
+    with bind.begin() as conn:
+        conn.execute(text("INSERT INTO contact_fts(contact_fts) VALUES ('rebuild')"))
+
+
+def to_match_query(query: str) -> str:
+    """Turn free text into an FTS5 prefix query: every term must match as a prefix."""
+    terms = re.findall(r"\w+", query)
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def search_contacts(conn, owner_id: int, query: str, limit: int, offset: int = 0) -> list[int]:
+    """Return ranked contact ids for ``owner_id`` matching ``query``."""
+    match = to_match_query(query)
+    if not match:
+        return []
+    rows = conn.execute(
+        text(
+            f"""SELECT contact.id FROM contact_fts
+                JOIN contact ON contact.id = contact_fts.rowid
+                WHERE contact_fts MATCH :match AND contact.owner_id = :owner_id
+                ORDER BY {RANK}
+                LIMIT :limit OFFSET :offset"""
+        ),
+        {"match": match, "owner_id": owner_id, "limit": limit, "offset": offset},
+    )
+    return [row[0] for row in rows]
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["rebuild"]:
+        sys.exit("usage: python -m app.search rebuild")
+    init_search()
+    rebuild_index()
+    print("contact_fts rebuilt")
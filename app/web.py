@@ -0,0 +1,83 @@
+"""Template and response helpers shared by the sync and async route handlers."""
+from __future__ import annotations
+import base64
+import json
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, RedirectResponse
+from fastapi.templating import Jinja2Templates
+
+from .bulk import FIELDS
+from .metrics import TimedTemplate
+from .models import Contact, User
+
+templates = Jinja2Templates(directory="templates")
+templates.env.template_class = TimedTemplate
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def encode_cursor(c: Contact) -> str:
+    raw = json.dumps([c.university, c.name, c.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[str, str, int] | None:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        university, name, cid = json.loads(raw)
+        return str(university), str(name), int(cid)
+    except (ValueError, TypeError):
+        return None
+
+def partial_mode(request: Request) -> str | None:
+    """Opt-in partial responses for mutations: "json" via Accept, "row" via X-Partial/HX-Request."""
+    if "application/json" in request.headers.get("accept", ""):
+        return "json"
+    if request.headers.get("x-partial") or request.headers.get("hx-request"):
+        return "row"
+    return None
+
+def mutation_response(request: Request, c: Contact | None, stats: dict | None = None, url: str = "/dashboard"):
+    """Redirect, or return the contact (JSON or row) plus the owner's counters for the stats cards."""
+    mode = partial_mode(request)
+    if mode is None:
+        return RedirectResponse(url=url, status_code=303)
+    if c is None:
+        return JSONResponse({"detail": "Not found"}, status_code=404)
+    if mode == "json":
+        return JSONResponse(jsonable_encoder({"id": c.id, **{f: getattr(c, f) for f in FIELDS}, "stats": stats}))
+    headers = {"X-Contact-Stats": json.dumps(stats)} if stats else None
+    return templates.TemplateResponse("_contact_row.html", {"request": request, "c": c}, headers=headers)
+
+def not_modified(request: Request, etag: str, last_modified: datetime | None) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            return last_modified.replace(microsecond=0) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def dashboard_validators(user: User, version: int, changed_at: Optional[datetime]) -> tuple[dict, datetime]:
+    changed_at = (changed_at or user.created_at).replace(tzinfo=timezone.utc)
+    headers = {
+        "ETag": f'W/"contacts-{user.id}-{version}"',
+        "Last-Modified": format_datetime(changed_at, usegmt=True),
+        "Cache-Control": "private, no-cache",
+    }
+    return headers, changed_at
+
+def render_dashboard(request: Request, user: User, stats: tuple, contacts: list[Contact], limit: int,
+                     key: Optional[tuple], headers: dict):
+    total, sent, reminders = stats
+    next_cursor = encode_cursor(contacts[limit - 1]) if len(contacts) > limit else None
+    contacts = contacts[:limit]
+    page = {"limit": limit, "next": next_cursor, "is_first": key is None}
+    return templates.TemplateResponse("index.html", {"request": request, "contacts": contacts, "user": user, "stats": {"total": total, "sent": sent, "reminders": reminders}, "page": page}, headers=headers)
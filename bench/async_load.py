@@ -0,0 +1,84 @@
+"""Sync vs async request handling under high concurrency on one uvicorn worker.
+
+Starts the app once with the sync handlers and once with CONTACT_DB_ASYNC=1,
+seeds the demo user with contacts through /contacts/import, then runs many
+concurrent clients mixing dashboard loads and partial-mode toggles.
+
+    python -m bench.async_load --clients 200 --seconds 10
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from bench.common import free_port, percentile, start_server
+
+MODES = {"sync": "0", "async": "1"}
+
+
+async def run_load(base: str, clients: int, seconds: float, contacts: int) -> dict:
+    limits = httpx.Limits(max_connections=clients + 4)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60) as client:
+        await client.post("/login", data={"username": "demo", "password": "demo1234"})
+        rows = "".join(f"Bench {i},University {i % 40},load testing,b{i}@example.com\n" for i in range(contacts))
+        await client.post("/contacts/import", files={"file": ("seed.csv", ("name,university,research_focus,contact_email\n" + rows).encode(), "text/csv")})
+        stop = time.monotonic() + seconds
+        latencies: dict[str, list[float]] = {"dashboard": [], "toggle": []}
+        errors = 0
+
+        async def worker() -> None:
+            nonlocal errors
+            while time.monotonic() < stop:
+                route = "dashboard" if random.random() < 0.7 else "toggle"
+                t0 = time.perf_counter()
+                if route == "dashboard":
+                    r = await client.get("/dashboard")
+                else:
+                    r = await client.post(f"/toggle-email/{random.randint(1, contacts)}", headers={"X-Partial": "row"})
+                if r.status_code >= 400:
+                    errors += 1
+                latencies[route].append((time.perf_counter() - t0) * 1000)
+
+        await asyncio.gather(*[worker() for _ in range(clients)])
+    total = sum(len(v) for v in latencies.values())
+    result = {"requests_per_s": round(total / seconds, 1), "errors": errors}
+    for route, samples in latencies.items():
+        result[f"{route}_p50_ms"] = round(percentile(samples, 50), 2)
+        result[f"{route}_p99_ms"] = round(percentile(samples, 99), 2)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", default="sync,async")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--contacts", type=int, default=500)
+    parser.add_argument("--profile", default="production", help="CONTACT_DB_PROFILE")
+    args = parser.parse_args()
+
+    results = {}
+    for mode in args.modes.split(","):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, CONTACT_DB=str(Path(tmp) / "bench.db"), CONTACT_DB_ASYNC=MODES[mode],
+                       CONTACT_DB_PROFILE=args.profile, FOLLOWUP_SCHEDULER="0")
+            port = free_port()
+            proc = start_server(env, port)
+            try:
+                results[mode] = asyncio.run(run_load(f"http://127.0.0.1:{port}", args.clients, args.seconds, args.contacts))
+            finally:
+                proc.terminate()
+                proc.wait()
+        print(mode, json.dumps(results[mode]))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Dashboard latency under a concurrent login storm.
+
+Starts the app under uvicorn once per hashing mode against a throwaway
+database, hammers POST /login from many clients while a few clients keep
+loading /dashboard, and prints dashboard p50/p95/p99 per mode.
+
+    python -m bench.login_storm --modes shared,process --storm 64 --seconds 10
+
+``shared`` reproduces the old behaviour (bcrypt on Starlette's request
+threadpool); ``process``/``thread`` use the dedicated hashing pool.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from bench.common import free_port, percentile, start_server
+
+
+async def run_storm(base: str, storm: int, viewers: int, seconds: float) -> dict:
+    login = {"username": "demo", "password": "demo1234"}
+    limits = httpx.Limits(max_connections=storm + viewers + 4)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60) as client:
+        await client.post("/login", data=login)
+        cookies = dict(client.cookies)
+        stop = time.monotonic() + seconds
+        dash: list[float] = []
+        logins = {"ok": 0, "busy": 0}
+
+        async def stormer() -> None:
+            while time.monotonic() < stop:
+                r = await client.post("/login", data=login, cookies={})
+                logins["busy" if r.status_code == 503 else "ok"] += 1
+
+        async def viewer() -> None:
+            while time.monotonic() < stop:
+                t0 = time.perf_counter()
+                await client.get("/dashboard", cookies=cookies)
+                dash.append((time.perf_counter() - t0) * 1000)
+
+        await asyncio.gather(*[stormer() for _ in range(storm)], *[viewer() for _ in range(viewers)])
+    return {
+        "dashboard_requests": len(dash),
+        "dashboard_p50_ms": round(percentile(dash, 50), 2),
+        "dashboard_p95_ms": round(percentile(dash, 95), 2),
+        "dashboard_p99_ms": round(percentile(dash, 99), 2),
+        "logins_ok": logins["ok"],
+        "logins_shed_503": logins["busy"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", default="shared,process")
+    parser.add_argument("--storm", type=int, default=64, help="concurrent login clients")
+    parser.add_argument("--viewers", type=int, default=4, help="concurrent dashboard clients")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--rounds", type=int, default=12, help="BCRYPT_ROUNDS")
+    args = parser.parse_args()
+
+    results = {}
+    for mode in args.modes.split(","):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, CONTACT_DB=str(Path(tmp) / "bench.db"), HASH_EXECUTOR=mode, BCRYPT_ROUNDS=str(args.rounds))
+            port = free_port()
+            proc = start_server(env, port)
+            try:
+                results[mode] = asyncio.run(run_storm(f"http://127.0.0.1:{port}", args.storm, args.viewers, args.seconds))
+            finally:
+                proc.terminate()
+                proc.wait()
+        print(mode, json.dumps(results[mode]))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
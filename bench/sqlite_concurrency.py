@@ -0,0 +1,130 @@
+"""SQLite write throughput and read latency under concurrent writes.
+
+Seeds a throwaway database, then runs writer threads doing toggle-style
+single-row updates alongside reader threads running the dashboard page
+query. Each configuration uses a fresh database:
+
+    python -m bench.sqlite_concurrency --writers 16 --readers 4 --seconds 5
+
+Configurations: ``default`` (stock engine), ``production`` (WAL + pragmas)
+and ``production+queue`` (also routes writes through the single-writer queue).
+"""
+from __future__ import annotations
+import argparse
+import json
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, SQLModel, select
+
+from app.db import WriteQueue, create_sqlite_engine
+from app.models import Contact, User
+from bench.common import percentile
+
+CONFIGS = ("default", "production", "production+queue")
+
+
+def seed(engine, contacts: int) -> None:
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        user = User(username="bench", password_hash="x")
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+        rows = [
+            {"name": f"Contact {i}", "university": f"University {i % 50}", "research_focus": "bench",
+             "contact_email": f"c{i}@example.com", "source_url": "#", "owner_id": user.id}
+            for i in range(contacts)
+        ]
+        session.execute(insert(Contact), rows)
+        session.commit()
+
+
+def run_config(config: str, contacts: int, writers: int, readers: int, seconds: float) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_sqlite_engine(str(Path(tmp) / "bench.db"), "production" if config.startswith("production") else "default")
+        seed(engine, contacts)
+        write_queue = WriteQueue(engine) if config.endswith("+queue") else None
+        stop = time.monotonic() + seconds
+        lock = threading.Lock()
+        stats = {"writes": 0, "locked_errors": 0}
+        read_ms: list[float] = []
+
+        def toggle(session: Session) -> None:
+            c = session.get(Contact, random.randint(1, contacts))
+            c.email_sent = not c.email_sent
+            c.email_sent_at = datetime.now(timezone.utc) if c.email_sent else None
+            session.add(c)
+
+        def writer() -> None:
+            while time.monotonic() < stop:
+                try:
+                    if write_queue is not None:
+                        write_queue.submit(toggle).result()
+                    else:
+                        with Session(engine) as session:
+                            toggle(session)
+                            session.commit()
+                except OperationalError:
+                    with lock:
+                        stats["locked_errors"] += 1
+                    continue
+                with lock:
+                    stats["writes"] += 1
+
+        def reader() -> None:
+            while time.monotonic() < stop:
+                t0 = time.perf_counter()
+                try:
+                    with Session(engine) as session:
+                        session.exec(
+                            select(Contact).where(Contact.owner_id == 1)
+                            .order_by(Contact.university, Contact.name, Contact.id).limit(50)
+                        ).all()
+                except OperationalError:
+                    continue
+                with lock:
+                    read_ms.append((time.perf_counter() - t0) * 1000)
+
+        threads = [threading.Thread(target=writer) for _ in range(writers)]
+        threads += [threading.Thread(target=reader) for _ in range(readers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        if write_queue is not None:
+            write_queue.stop()
+        engine.dispose()
+    return {
+        "writes_per_s": round(stats["writes"] / seconds, 1),
+        "locked_errors": stats["locked_errors"],
+        "reads": len(read_ms),
+        "read_p50_ms": round(percentile(read_ms, 50), 2),
+        "read_p99_ms": round(percentile(read_ms, 99), 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--configs", default=",".join(CONFIGS))
+    parser.add_argument("--contacts", type=int, default=5000)
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    results = {}
+    for config in args.configs.split(","):
+        results[config] = run_config(config, args.contacts, args.writers, args.readers, args.seconds)
+        print(config, json.dumps(results[config]))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+"""Mixed-workload benchmark against a seeded database, with JSON results.
+
+Seeds a throwaway database (via CONTACT_DB) with synthetic users and
+contacts, then runs concurrent virtual users that log in and mix dashboard
+loads, toggles, edits and adds. Reports throughput and p50/p95/p99 latency
+per route, optionally saves the run as JSON, and compares it with a baseline:
+
+    python -m bench.suite --users 50 --contacts 2000 --clients 32 --requests 200 --output run.json
+    python -m bench.suite --transport uvicorn --compare run.json --max-regression 20
+
+``asgi`` drives the app in-process through httpx.ASGITransport (no network,
+good for comparing code changes); ``uvicorn`` starts a real server. App
+settings (CONTACT_DB_ASYNC, CONTACT_DB_WRITE_QUEUE, HASH_EXECUTOR,
+BCRYPT_ROUNDS, ...) come from the environment; their effective values,
+defaults included, are recorded in the results. Each virtual user follows
+its own seeded random sequence, so a run with the same arguments issues the
+same requests.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import httpx
+
+from bench.common import ROOT, free_port, percentile, start_server
+
+PASSWORD = "bench-pass-1234"
+# Relative weight of each operation after the initial login
+DEFAULT_MIX = "dashboard=50,toggle-email=15,toggle-reminder=5,edit=15,add=10,login=5"
+# Settings that shape performance: env var -> module attribute holding the effective value
+RECORDED_SETTINGS = {
+    "CONTACT_DB_PROFILE": ("app.db", "DB_PROFILE"),
+    "CONTACT_DB_ASYNC": ("app.db", "DB_ASYNC"),
+    "CONTACT_DB_WRITE_QUEUE": ("app.db", "DB_WRITE_QUEUE"),
+    "CONTACT_DB_POOL_SIZE": ("app.db", "DB_POOL_SIZE"),
+    "CONTACT_DB_BUSY_TIMEOUT_MS": ("app.db", "DB_BUSY_TIMEOUT_MS"),
+    "HASH_EXECUTOR": ("app.auth", "HASH_EXECUTOR"),
+    "HASH_WORKERS": ("app.auth", "HASH_WORKERS"),
+    "HASH_QUEUE_LIMIT": ("app.auth", "HASH_QUEUE_LIMIT"),
+    "BCRYPT_ROUNDS": ("app.auth", "BCRYPT_ROUNDS"),
+    "USER_CACHE_SIZE": ("app.cache", "USER_CACHE_SIZE"),
+    "USER_CACHE_TTL": ("app.cache", "USER_CACHE_TTL"),
+    "FOLLOWUP_SCHEDULER": ("app.followups", "FOLLOWUP_SCHEDULER"),
+    "METRICS_SERVER_TIMING": ("app.metrics", "METRICS_SERVER_TIMING"),
+}
+
+UNIVERSITIES = [f"University {chr(65 + i // 26)}{chr(65 + i % 26)}" for i in range(60)]
+TOPICS = ["machine learning", "computational neuroscience", "databases", "distributed systems", "robotics",
+          "computer vision", "bioinformatics", "human-computer interaction", "compilers", "cryptography"]
+
+
+# ─────────────────────────────── Seeding ───────────────────────────────
+def seed_database(users: int, contacts: int, seed: int) -> dict[str, list[int]]:
+    """Create the schema in CONTACT_DB and fill it; returns contact ids per username.
+
+    Must run after CONTACT_DB is set, since app.db reads it at import time.
+    """
+    from sqlalchemy import insert, select
+    from sqlmodel import Session
+
+    from app.auth import get_password_hash
+    from app.db import engine, init_db
+    from app.models import Contact, User
+    from app.search import init_search
+
+    init_db()
+    init_search()
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    # One bcrypt hash for everybody: seeding N users should not cost N hashes
+    password_hash = get_password_hash(PASSWORD)
+    with Session(engine) as session:
+        session.execute(insert(User.__table__), [
+            {"username": f"bench{u:04d}", "email": f"bench{u:04d}@example.com", "password_hash": password_hash,
+             "created_at": now, "followup_days": 7, "contacts_version": 0}
+            for u in range(users)
+        ])
+        owners = dict(session.execute(select(User.id, User.username)).all())
+        rows = []
+        for i in range(contacts):
+            sent = rng.random() < 0.4
+            rows.append({
+                "name": f"Contact {i:06d}",
+                "university": rng.choice(UNIVERSITIES),
+                "research_focus": ", ".join(rng.sample(TOPICS, 2)),
+                "contact_email": f"contact{i}@example.com",
+                "source_url": "#",
+                "email_sent": sent,
+                "email_sent_at": now - timedelta(days=rng.uniform(0, 30)) if sent else None,
+                "reminder_sent": sent and rng.random() < 0.3,
+                "owner_id": rng.choice(list(owners)),
+            })
+            if len(rows) >= 1000:
+                session.execute(insert(Contact.__table__), rows)
+                rows.clear()
+        if rows:
+            session.execute(insert(Contact.__table__), rows)
+        session.commit()
+        ids: dict[str, list[int]] = {name: [] for name in owners.values()}
+        for cid, owner_id in session.execute(select(Contact.id, Contact.owner_id).order_by(Contact.id)):
+            ids[owners[owner_id]].append(cid)
+    engine.dispose()
+    return ids
+
+
+# ─────────────────────────────── Workload ──────────────────────────────
+def parse_mix(spec: str) -> dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        op, _, weight = part.partition("=")
+        mix[op.strip()] = float(weight)
+    unknown = set(mix) - set(OPERATIONS)
+    if unknown:
+        raise SystemExit(f"unknown operation(s) in --mix: {', '.join(sorted(unknown))}")
+    return mix
+
+
+async def op_login(client: httpx.AsyncClient, rng: random.Random, username: str, ids: list[int]) -> tuple[str, httpx.Response]:
+    return "POST /login", await client.post("/login", data={"username": username, "password": PASSWORD})
+
+
+async def op_dashboard(client, rng, username, ids):
+    return "GET /dashboard", await client.get("/dashboard")
+
+
+async def op_toggle_email(client, rng, username, ids):
+    return "POST /toggle-email", await client.post(f"/toggle-email/{rng.choice(ids)}", headers={"X-Partial": "row"})
+
+
+async def op_toggle_reminder(client, rng, username, ids):
+    return "POST /toggle-reminder", await client.post(f"/toggle-reminder/{rng.choice(ids)}", headers={"X-Partial": "row"})
+
+
+async def op_edit(client, rng, username, ids):
+    cid = rng.choice(ids)
+    data = {"name": f"Contact {cid:06d}", "university": rng.choice(UNIVERSITIES),
+            "research_focus": ", ".join(rng.sample(TOPICS, 2)), "contact_email": f"contact{cid}@example.com",
+            "source_url": "#"}
+    if rng.random() < 0.5:
+        data["email_sent"] = "on"
+    return "POST /edit", await client.post(f"/edit/{cid}", data=data, headers={"X-Partial": "row"})
+
+
+async def op_add(client, rng, username, ids):
+    n = rng.randrange(10**9)
+    data = {"name": f"Added {n}", "university": rng.choice(UNIVERSITIES), "research_focus": rng.choice(TOPICS),
+            "contact_email": f"added{n}@example.com", "source_url": "#"}
+    return "POST /add", await client.post("/add", data=data)
+
+
+OPERATIONS = {
+    "login": op_login,
+    "dashboard": op_dashboard,
+    "toggle-email": op_toggle_email,
+    "toggle-reminder": op_toggle_reminder,
+    "edit": op_edit,
+    "add": op_add,
+}
+
+
+async def virtual_user(make_client, index: int, username: str, ids: list[int], mix: dict[str, float],
+                       requests: int, deadline: float, seed: int, samples: dict[str, list[float]],
+                       errors: dict[str, int]) -> None:
+    rng = random.Random(seed * 100_003 + index)
+    ops = list(mix)
+    weights = [mix[op] for op in ops]
+    if not ids:
+        # Users without contacts can only read and add
+        ops, weights = zip(*[(op, w) for op, w in zip(ops, weights) if op in ("login", "dashboard", "add")])
+    async with make_client() as client:
+        for i in range(requests + 1):
+            if time.monotonic() >= deadline:
+                break
+            op = "login" if i == 0 else rng.choices(ops, weights)[0]
+            t0 = time.perf_counter()
+            try:
+                route, response = await OPERATIONS[op](client, rng, username, ids)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                route, failed = op, True
+            samples.setdefault(route, []).append((time.perf_counter() - t0) * 1000)
+            if failed:
+                errors[route] = errors.get(route, 0) + 1
+
+
+def summarize(samples: dict[str, list[float]], errors: dict[str, int], elapsed: float) -> dict:
+    def stats(values: list[float], error_count: int) -> dict:
+        return {
+            "count": len(values),
+            "errors": error_count,
+            "rps": round(len(values) / elapsed, 2),
+            "mean_ms": round(sum(values) / len(values), 2) if values else 0.0,
+            "p50_ms": round(percentile(values, 50), 2),
+            "p95_ms": round(percentile(values, 95), 2),
+            "p99_ms": round(percentile(values, 99), 2),
+            "max_ms": round(max(values, default=0.0), 2),
+        }
+
+    routes = {route: stats(values, errors.get(route, 0)) for route, values in sorted(samples.items())}
+    everything = [v for values in samples.values() for v in values]
+    return {"elapsed_s": round(elapsed, 2), "total": stats(everything, sum(errors.values())), "routes": routes}
+
+
+async def run_workload(args, make_client, accounts: dict[str, list[int]]) -> dict:
+    mix = parse_mix(args.mix)
+    usernames = sorted(accounts)
+    samples: dict[str, list[float]] = {}
+    errors: dict[str, int] = {}
+    deadline = time.monotonic() + (args.seconds or float("inf"))
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        virtual_user(make_client, i, usernames[i % len(usernames)], accounts[usernames[i % len(usernames)]], mix,
+                     args.requests, deadline, args.seed, samples, errors)
+        for i in range(args.clients)
+    ])
+    return summarize(samples, errors, time.perf_counter() - start)
+
+
+async def run_asgi(args, accounts: dict[str, list[int]]) -> dict:
+    from app.main import app
+
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        return await run_workload(args, lambda: httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120), accounts)
+    finally:
+        await app.router.shutdown()
+
+
+def run_uvicorn(args, accounts: dict[str, list[int]]) -> dict:
+    port = free_port()
+    proc = start_server(dict(os.environ), port)
+    try:
+        return asyncio.run(run_workload(args, lambda: httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=120), accounts))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+# ─────────────────────────────── Reporting ─────────────────────────────
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def effective_settings() -> dict:
+    """Values the app resolved from the environment (defaults included) in this process."""
+    settings = {}
+    for env, (module, attr) in RECORDED_SETTINGS.items():
+        settings[env] = getattr(importlib.import_module(module), attr)
+    return settings
+
+
+def print_table(result: dict) -> None:
+    print(f"{'route':<24}{'count':>8}{'err':>6}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for route, s in [*result["routes"].items(), ("TOTAL", result["total"])]:
+        print(f"{route:<24}{s['count']:>8}{s['errors']:>6}{s['rps']:>9}{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}")
+
+
+def compare(result: dict, baseline: dict, max_regression: float) -> list[str]:
+    """Print per-route deltas against a saved run; return the regressions over the threshold."""
+    regressions = []
+    print(f"\n{'route':<24}{'p95 base':>10}{'p95 now':>10}{'delta':>9}{'rps base':>10}{'rps now':>10}")
+    for route, now in [*result["routes"].items(), ("TOTAL", result["total"])]:
+        base = baseline["total"] if route == "TOTAL" else baseline["routes"].get(route)
+        if not base:
+            continue
+        delta = (now["p95_ms"] - base["p95_ms"]) / base["p95_ms"] * 100 if base["p95_ms"] else 0.0
+        print(f"{route:<24}{base['p95_ms']:>10}{now['p95_ms']:>10}{delta:>+8.1f}%{base['rps']:>10}{now['rps']:>10}")
+        if delta > max_regression:
+            regressions.append(f"{route}: p95 {base['p95_ms']}ms -> {now['p95_ms']}ms ({delta:+.1f}%)")
+    if baseline["total"]["rps"] and result["total"]["rps"] < baseline["total"]["rps"] * (1 - max_regression / 100):
+        regressions.append(f"throughput {baseline['total']['rps']} -> {result['total']['rps']} req/s")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--contacts", type=int, default=2000, help="total contacts spread over the users")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent virtual users")
+    parser.add_argument("--requests", type=int, default=100, help="requests per virtual user after login")
+    parser.add_argument("--seconds", type=float, default=0, help="optional time limit for the run")
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--transport", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", type=Path, help="write the results as JSON")
+    parser.add_argument("--compare", type=Path, help="baseline JSON from an earlier run")
+    parser.add_argument("--max-regression", type=float, default=20.0, help="allowed p95/throughput regression in percent")
+    parser.add_argument("--keep-db", action="store_true", help="leave the seeded database in place")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="contact-bench-")
+    os.environ["CONTACT_DB"] = str(Path(tmp) / "bench.db")
+    os.environ.setdefault("FOLLOWUP_SCHEDULER", "0")
+    try:
+        t0 = time.perf_counter()
+        accounts = seed_database(args.users, args.contacts, args.seed)
+        seed_s = time.perf_counter() - t0
+        if args.transport == "asgi":
+            result = asyncio.run(run_asgi(args, accounts))
+        else:
+            result = run_uvicorn(args, accounts)
+    finally:
+        if args.keep_db:
+            print(f"database kept at {os.environ['CONTACT_DB']}")
+        else:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    result = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git": git_revision(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "seed_s": round(seed_s, 2),
+            "args": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()},
+            # The uvicorn child inherits this environment, so it resolves the same values
+            "settings": effective_settings(),
+        },
+        **result,
+    }
+    print_table(result)
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2) + "\n")
+        print(f"results written to {args.output}")
+    if args.compare:
+        regressions = compare(result, json.loads(args.compare.read_text()), args.max_regression)
+        if regressions:
+            print("\nregressions over threshold:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""Point the app at a throwaway database before any app module is imported."""
+from __future__ import annotations
+import os
+import tempfile
+
+import pytest
+
+os.environ["CONTACT_DB"] = os.path.join(tempfile.mkdtemp(prefix="contact-tests-"), "test.db")
+os.environ["FOLLOWUP_SCHEDULER"] = "0"
+
+
+@pytest.fixture
+def db():
+    """An initialised, empty database; yields the sync engine."""
+    from sqlalchemy import delete
+    from sqlmodel import Session
+
+    from app.db import engine, init_db
+    from app.models import Contact, FollowUpOutbox, User
+
+    init_db()
+    yield engine
+    with Session(engine) as session:
+        for model in (FollowUpOutbox, Contact, User):
+            session.execute(delete(model))
+        session.commit()
@@ -0,0 +1,21 @@
+from __future__ import annotations
+import io
+
+from app.bulk import iter_records
+
+ROW = b'{"name": "A", "university": "U", "research_focus": "r", "contact_email": "a@example.com"}\n'
+
+
+def test_undecodable_jsonl_line_is_reported_and_skipped():
+    records = list(iter_records(io.BytesIO(ROW + b'{"name": "\xff"}\n' + ROW), "jsonl"))
+
+    assert [(line, error is None) for line, _, error in records] == [(1, True), (2, False), (3, True)]
+    assert "UTF-8" in records[1][2]
+
+
+def test_undecodable_csv_line_stops_after_the_rows_before_it():
+    upload = b"name,university,research_focus,contact_email\nA,U,r,a@example.com\nB,\xff,r,b@example.com\nC,U,r,c@example.com\n"
+    records = list(iter_records(io.BytesIO(upload), "csv"))
+
+    assert [record["name"] for _, record, error in records if error is None] == ["A"]
+    assert records[-1][0] == 3 and "import stopped" in records[-1][2]
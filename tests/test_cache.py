@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from sqlmodel import Session
+
+from app.cache import UserCache, user_cache
+from app.models import User
+
+
+def _add_user(engine) -> int:
+    with Session(engine) as session:
+        user = User(username="cached", password_hash="x", followup_days=7)
+        session.add(user)
+        session.commit()
+        return user.id
+
+
+def test_committed_user_change_is_reloaded(db):
+    uid = _add_user(db)
+    user_cache.clear()
+
+    def load(uid: int) -> User | None:
+        with Session(db) as session:
+            return session.get(User, uid)
+
+    assert user_cache.get(uid, load).followup_days == 7
+    with Session(db) as session:
+        user = session.get(User, uid)
+        user.followup_days = 3
+        session.add(user)
+        session.flush()
+        # Not committed yet: a concurrent reader still sees (and may cache) the old row
+        assert user_cache.get(uid, load).followup_days == 7
+        session.commit()
+    assert user_cache.get(uid, load).followup_days == 3
+
+
+def test_rolled_back_change_keeps_the_entry(db):
+    uid = _add_user(db)
+    user_cache.clear()
+    calls = []
+
+    def load(uid: int) -> User | None:
+        calls.append(uid)
+        with Session(db) as session:
+            return session.get(User, uid)
+
+    user_cache.get(uid, load)
+    with Session(db) as session:
+        user = session.get(User, uid)
+        user.followup_days = 30
+        session.add(user)
+        session.flush()
+        session.rollback()
+    assert user_cache.get(uid, load).followup_days == 7
+    assert len(calls) == 1
+
+
+def test_load_overlapping_an_invalidation_is_not_stored():
+    cache = UserCache(maxsize=8, ttl=60)
+    calls = []
+
+    def racing_load(uid: int) -> User:
+        calls.append(uid)
+        # A commit for this user lands while the (old) row is being read
+        cache.invalidate(uid)
+        return User(id=uid, username="stale", password_hash="x")
+
+    assert cache.get(1, racing_load).username == "stale"
+    assert cache.stats()["size"] == 0
+    assert cache.get(1, lambda uid: User(id=uid, username="fresh", password_hash="x")).username == "fresh"
+    assert cache.get(1, racing_load).username == "fresh"
+    assert len(calls) == 1
@@ -0,0 +1,182 @@
+from __future__ import annotations
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, or_
+from sqlmodel import Session, select
+
+from app.followups import FollowUpScheduler, OutboxBackend, due_query, due_soon, undelivered_filter
+from app.models import Contact, FollowUpOutbox, User
+
+
+def _seed(engine, due: int = 20, owners: int = 2, email: bool = True) -> list[int]:
+    """Per owner: ``due`` overdue contacts plus a fresh, a reminded and an unsent one."""
+    now = datetime.now(timezone.utc)
+    due_ids = []
+    with Session(engine) as session:
+        for o in range(owners):
+            user = User(username=f"owner{o}", password_hash="x", followup_days=7,
+                        email=f"owner{o}@example.com" if email else None)
+            session.add(user)
+            session.flush()
+            overdue = [
+                Contact(name=f"due {o}-{i}", university="U", research_focus="r", contact_email=f"d{o}-{i}@example.com",
+                        source_url="#", email_sent=True, email_sent_at=now - timedelta(days=30, minutes=i), owner_id=user.id)
+                for i in range(due)
+            ]
+            session.add_all(overdue + [
+                Contact(name="fresh", university="U", research_focus="r", contact_email="f@example.com", source_url="#",
+                        email_sent=True, email_sent_at=now - timedelta(days=1), owner_id=user.id),
+                Contact(name="reminded", university="U", research_focus="r", contact_email="r@example.com", source_url="#",
+                        email_sent=True, email_sent_at=now - timedelta(days=30), reminder_sent=True, owner_id=user.id),
+                Contact(name="unsent", university="U", research_focus="r", contact_email="u@example.com", source_url="#",
+                        owner_id=user.id),
+            ])
+            session.flush()
+            due_ids += [c.id for c in overdue]
+        session.commit()
+    return due_ids
+
+
+def _count(engine, query) -> int:
+    with Session(engine) as session:
+        return session.exec(query).one()
+
+
+class FailingBackend:
+    def deliver(self, session, contacts):
+        raise RuntimeError("smtp down")
+
+
+class PickyBackend(OutboxBackend):
+    """Delivers only to the first contact's owner, as if the others had no address."""
+
+    def deliver(self, session, contacts):
+        return super().deliver(session, [c for c in contacts if c.owner_id == contacts[0].owner_id])
+
+
+def test_delivery_is_recorded_without_touching_reminder_sent(db):
+    due_ids = _seed(db)
+    scheduler = FollowUpScheduler(OutboxBackend(), batch_size=7)
+
+    assert scheduler.run_once() == len(due_ids)
+    assert scheduler.run_once() == 0
+
+    assert _count(db, select(func.count(FollowUpOutbox.id))) == len(due_ids)
+    # Follow-ups remind the owner, not the professor
+    assert _count(db, select(func.count(FollowUpOutbox.id)).where(FollowUpOutbox.to_email.like("owner%"))) == len(due_ids)
+    with Session(db) as session:
+        delivered = session.exec(select(Contact).where(Contact.id.in_(due_ids))).all()
+        assert all(c.followup_sent_at and not c.reminder_sent and c.followup_claim is None for c in delivered)
+        owner_id = delivered[0].owner_id
+    # The user still has to follow up, so the due view keeps listing them
+    assert {c.id for c, _ in due_soon(owner_id, 7)} >= {c.id for c in delivered if c.owner_id == owner_id}
+
+
+def test_concurrent_claims_are_disjoint(db):
+    due_ids = _seed(db, due=60)
+    workers = [FollowUpScheduler(OutboxBackend(), batch_size=5) for _ in range(4)]
+    claimed: list[list[int]] = [[] for _ in workers]
+    barrier = threading.Barrier(len(workers))
+
+    def claim_all(i: int) -> None:
+        barrier.wait()
+        while True:
+            _, ids = workers[i].claim_batch(datetime.now(timezone.utc))
+            if not ids:
+                return
+            claimed[i] += ids
+
+    threads = [threading.Thread(target=claim_all, args=(i,)) for i in range(len(workers))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    everything = [cid for ids in claimed for cid in ids]
+    assert len(everything) == len(set(everything))
+    assert sorted(everything) == sorted(due_ids)
+
+
+def test_claim_is_exclusive_until_the_lease_expires(db):
+    _seed(db, due=3, owners=1)
+    first = FollowUpScheduler(OutboxBackend(), lease=timedelta(minutes=5))
+    second = FollowUpScheduler(OutboxBackend(), lease=timedelta(minutes=5))
+    now = datetime.now(timezone.utc)
+
+    token, ids = first.claim_batch(now)
+    assert len(ids) == 3
+    assert second.claim_batch(now + timedelta(minutes=1))[1] == []
+
+    takeover, taken = second.claim_batch(now + timedelta(minutes=6))
+    assert sorted(taken) == sorted(ids)
+    # The original worker lost its lease and must not deliver or mark the rows
+    assert first.process_batch(token, ids) == 0
+    assert _count(db, select(func.count(FollowUpOutbox.id))) == 0
+    assert second.process_batch(takeover, taken) == 3
+    assert _count(db, select(func.count(FollowUpOutbox.id))) == 3
+
+
+def test_failed_delivery_releases_claims(db):
+    due_ids = _seed(db, due=4, owners=1)
+    failing = FollowUpScheduler(FailingBackend())
+
+    assert failing.run_once() == 0
+    assert failing.failed == len(due_ids)
+    with Session(db) as session:
+        rows = session.exec(select(Contact).where(Contact.id.in_(due_ids))).all()
+        assert all(c.followup_claim is None and c.followup_claimed_at is None and c.followup_sent_at is None for c in rows)
+    assert _count(db, select(func.count(FollowUpOutbox.id))) == 0
+
+    # Released rows are picked up straight away, without waiting for the lease
+    assert FollowUpScheduler(OutboxBackend()).run_once() == len(due_ids)
+
+
+def test_only_delivered_contacts_are_marked(db):
+    due_ids = _seed(db, due=3, owners=2)
+    scheduler = FollowUpScheduler(PickyBackend(), batch_size=len(due_ids))
+    token, ids = scheduler.claim_batch(datetime.now(timezone.utc))
+
+    assert scheduler.process_batch(token, ids) == 3
+    with Session(db) as session:
+        rows = session.exec(select(Contact).where(Contact.id.in_(due_ids))).all()
+    sent = [c for c in rows if c.followup_sent_at]
+    assert len(sent) == 3 and len({c.owner_id for c in sent}) == 1
+    # The skipped ones are released for the next pass instead of waiting out the lease
+    assert all(c.followup_claim is None for c in rows)
+    assert FollowUpScheduler(OutboxBackend()).run_once() == 3
+
+
+def test_owners_without_email_are_not_claimed(db):
+    _seed(db, due=3, owners=1, email=False)
+    scheduler = FollowUpScheduler(OutboxBackend())
+
+    assert scheduler.claim_batch(datetime.now(timezone.utc))[1] == []
+    assert scheduler.run_once() == 0
+    assert _count(db, select(func.count(FollowUpOutbox.id))) == 0
+
+
+def _plan(engine, query) -> str:
+    sql = str(query.compile(engine, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        return "\n".join(row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+
+
+@pytest.mark.parametrize("which", ["scheduler", "due_soon"])
+def test_due_queries_read_the_partial_indexes(db, which):
+    _seed(db, due=50, owners=3)
+    now = datetime.now(timezone.utc)
+    if which == "scheduler":
+        query = (
+            due_query(now, pending=undelivered_filter)
+            .where(or_(Contact.followup_claimed_at.is_(None), Contact.followup_claimed_at < now.replace(tzinfo=None)))
+            .with_only_columns(Contact.id).order_by(Contact.email_sent_at).limit(10)
+        )
+        index = "ix_contact_followup_undelivered"
+    else:
+        query = due_query(now, timedelta(days=7)).where(Contact.owner_id == 2).order_by(Contact.email_sent_at).limit(10)
+        index = "ix_contact_owner_followup_pending"
+    plan = _plan(db, query)
+    assert index in plan
+    assert "SCAN contact" not in plan and "TEMP B-TREE" not in plan
@@ -0,0 +1,69 @@
+from __future__ import annotations
+import threading
+from collections import Counter
+
+import pytest
+from sqlmodel import Session, select
+
+from app.db import WriteQueue
+from app.models import User
+
+
+def _usernames(engine) -> set[str]:
+    with Session(engine) as session:
+        return set(session.exec(select(User.username)).all())
+
+
+def _hold(queue: WriteQueue) -> threading.Event:
+    """Occupy the writer with a job that waits, so the next submissions queue up and drain together."""
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocker(session: Session) -> None:
+        started.set()
+        release.wait(5)
+
+    queue.submit(blocker)
+    assert started.wait(5)
+    return release
+
+
+def test_failing_job_does_not_sink_its_group(db):
+    queue = WriteQueue(db)
+    calls: Counter = Counter()
+
+    def add(name: str):
+        def job(session: Session) -> str:
+            calls[name] += 1
+            session.add(User(username=name, password_hash="x"))
+            if name == "bad":
+                raise ValueError("rejected")
+            return name
+        return job
+
+    release = _hold(queue)
+    futures = {name: queue.submit(add(name)) for name in ("first", "bad", "last")}
+    release.set()
+
+    assert futures["first"].result(5) == "first"
+    assert futures["last"].result(5) == "last"
+    with pytest.raises(ValueError, match="rejected"):
+        futures["bad"].result(5)
+    queue.stop()
+
+    assert _usernames(db) == {"first", "last"}
+    # The shared transaction got as far as the failing job; then each job ran on its own
+    assert calls == {"first": 2, "bad": 2, "last": 1}
+
+
+def test_stop_drains_queued_jobs(db):
+    queue = WriteQueue(db)
+    release = _hold(queue)
+    names = [f"queued{i}" for i in range(5)]
+    futures = [queue.submit(lambda session, name=name: session.add(User(username=name, password_hash="x"))) for name in names]
+
+    threading.Timer(0.1, release.set).start()
+    queue.stop()
+
+    assert all(f.done() and f.exception() is None for f in futures)
+    assert _usernames(db) == set(names)